@@ -5,7 +5,7 @@ from flask_cors import CORS
 
 db = SQLAlchemy()
 
-def create_app():
+def create_app(config=None):
     app = Flask(__name__)
 
     CORS(app, resources={r"/*": {"origins": "*"}})
@@ -15,8 +15,80 @@ def create_app():
     app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = False
     app.config["SECRET_KEY"] = "dev"
 
+    # Quote cache: "sqlite" is shared by all worker processes on the host, "memory" is per process
+    app.config["QUOTE_CACHE_BACKEND"] = os.environ.get("QUOTE_CACHE_BACKEND", "sqlite")
+    app.config["QUOTE_CACHE_PATH"] = os.environ.get("QUOTE_CACHE_PATH", os.path.join(app.instance_path, "quote_cache.db"))
+    app.config["QUOTE_CACHE_MAXSIZE"] = int(os.environ.get("QUOTE_CACHE_MAXSIZE", 100))
+    # Quotes older than the soft TTL are served and refreshed in the background; after the hard TTL they are dropped
+    app.config["QUOTE_CACHE_SOFT_TTL"] = int(os.environ.get("QUOTE_CACHE_SOFT_TTL", 900))
+    app.config["QUOTE_CACHE_TTL"] = int(os.environ.get("QUOTE_CACHE_TTL", 3600))
+    app.config["STATIC_CACHE_TTL"] = int(os.environ.get("STATIC_CACHE_TTL", 86400))
+    app.config["NEGATIVE_CACHE_TTL"] = int(os.environ.get("NEGATIVE_CACHE_TTL", 600))
+    app.config["NEGATIVE_CACHE_MAXSIZE"] = int(os.environ.get("NEGATIVE_CACHE_MAXSIZE", 1000))
+
+    # Background jobs; set SCHEDULER_ENABLED=0 to run none of them in this worker
+    app.config["SCHEDULER_ENABLED"] = os.environ.get("SCHEDULER_ENABLED", "1") == "1"
+
+    # Background refresh of held and watched symbols; the interval should stay below the soft TTL
+    app.config["QUOTE_REFRESH_ENABLED"] = os.environ.get("QUOTE_REFRESH_ENABLED", "1") == "1"
+    app.config["QUOTE_REFRESH_INTERVAL"] = int(os.environ.get("QUOTE_REFRESH_INTERVAL", 600))
+    app.config["QUOTE_REFRESH_BATCH_SIZE"] = int(os.environ.get("QUOTE_REFRESH_BATCH_SIZE", 50))
+
+    # Market movers snapshot: extra symbols ranked on top of the assets table (comma separated,
+    # defaults to movers_service.MOVERS_UNIVERSE), entries per ranking and seconds between recomputes
+    app.config["MARKET_MOVERS_ENABLED"] = os.environ.get("MARKET_MOVERS_ENABLED", "1") == "1"
+    app.config["MARKET_MOVERS_UNIVERSE"] = (
+        [s.strip().upper() for s in os.environ["MARKET_MOVERS_UNIVERSE"].split(",") if s.strip()]
+        if "MARKET_MOVERS_UNIVERSE" in os.environ else None
+    )
+    app.config["MARKET_MOVERS_TOP_K"] = int(os.environ.get("MARKET_MOVERS_TOP_K", 10))
+    app.config["MARKET_MOVERS_INTERVAL"] = int(os.environ.get("MARKET_MOVERS_INTERVAL", 300))
+
+    # Daily portfolio_history snapshots; each run only writes days that are still missing
+    app.config["PORTFOLIO_SNAPSHOT_ENABLED"] = os.environ.get("PORTFOLIO_SNAPSHOT_ENABLED", "1") == "1"
+    app.config["PORTFOLIO_SNAPSHOT_INTERVAL"] = int(os.environ.get("PORTFOLIO_SNAPSHOT_INTERVAL", 3600))
+
+    # Directory of the memory-mapped columnar copy of asset_history used by the history endpoints
+    app.config["PRICE_STORE_DIR"] = os.environ.get("PRICE_STORE_DIR", os.path.join(app.instance_path, "price_store"))
+
+    # Seconds between flushes of intraday prices buffered by trades into asset_history
+    app.config["ASSET_HISTORY_FLUSH_INTERVAL"] = int(os.environ.get("ASSET_HISTORY_FLUSH_INTERVAL", 30))
+
+    # Seconds between rebuilds of the in-memory asset search index
+    app.config["SEARCH_INDEX_REBUILD_INTERVAL"] = int(os.environ.get("SEARCH_INDEX_REBUILD_INTERVAL", 300))
+
+    # Market data provider: "yfinance", "record" (yfinance, saving responses to MARKET_DATA_RECORD_DIR)
+    # or "replay" (serves saved responses offline after MARKET_DATA_REPLAY_LATENCY seconds)
+    app.config["MARKET_DATA_PROVIDER"] = os.environ.get("MARKET_DATA_PROVIDER", "yfinance")
+    app.config["MARKET_DATA_RECORD_DIR"] = os.environ.get("MARKET_DATA_RECORD_DIR", os.path.join(app.instance_path, "market_data"))
+    app.config["MARKET_DATA_REPLAY_LATENCY"] = float(os.environ.get("MARKET_DATA_REPLAY_LATENCY", 0.0))
+    app.config["MARKET_DATA_REPLAY_JITTER"] = float(os.environ.get("MARKET_DATA_REPLAY_JITTER", 0.0))
+
+    # Circuit breaker around yfinance: consecutive failed or slow calls before it opens,
+    # seconds a call may take before it counts as slow, seconds before a recovery probe
+    app.config["MARKET_DATA_BREAKER_FAILURES"] = int(os.environ.get("MARKET_DATA_BREAKER_FAILURES", 5))
+    app.config["MARKET_DATA_BREAKER_SLOW_CALL"] = float(os.environ.get("MARKET_DATA_BREAKER_SLOW_CALL", 8.0))
+    app.config["MARKET_DATA_BREAKER_RESET"] = float(os.environ.get("MARKET_DATA_BREAKER_RESET", 30.0))
+
+    if config:
+        app.config.update(config)
+
     db.init_app(app)
 
+    from .services.cache import configure_cache
+    if app.config["QUOTE_CACHE_BACKEND"] == "sqlite":
+        os.makedirs(os.path.dirname(app.config["QUOTE_CACHE_PATH"]), exist_ok=True)
+    configure_cache(
+        app.config["QUOTE_CACHE_BACKEND"],
+        path=app.config["QUOTE_CACHE_PATH"],
+        maxsize=app.config["QUOTE_CACHE_MAXSIZE"],
+        ttl=app.config["QUOTE_CACHE_TTL"],
+        soft_ttl=app.config["QUOTE_CACHE_SOFT_TTL"],
+        static_ttl=app.config["STATIC_CACHE_TTL"],
+        negative_ttl=app.config["NEGATIVE_CACHE_TTL"],
+        negative_maxsize=app.config["NEGATIVE_CACHE_MAXSIZE"],
+    )
+
     from flask_restx import Api
     api = Api(app, doc='/swagger')
 
@@ -38,4 +110,36 @@ def create_app():
     from .routes.insights import api_ns as insights_api_ns
     api.add_namespace(insights_api_ns, path='/insights')
 
+    from .services.market_data import configure_provider
+    configure_provider(
+        app.config["MARKET_DATA_PROVIDER"],
+        directory=app.config["MARKET_DATA_RECORD_DIR"],
+        latency=app.config["MARKET_DATA_REPLAY_LATENCY"],
+        jitter=app.config["MARKET_DATA_REPLAY_JITTER"],
+    )
+
+    from .services.price_store import configure_price_store
+    configure_price_store(app.config["PRICE_STORE_DIR"])
+
+    from .services.circuit_breaker import market_data_breaker
+    market_data_breaker.configure(
+        failure_threshold=app.config["MARKET_DATA_BREAKER_FAILURES"],
+        slow_call_threshold=app.config["MARKET_DATA_BREAKER_SLOW_CALL"],
+        reset_timeout=app.config["MARKET_DATA_BREAKER_RESET"],
+    )
+
+    from sqlalchemy.exc import SQLAlchemyError
+    from .services.asset_service import warm_cache_from_snapshot
+    with app.app_context():
+        try:
+            warm_cache_from_snapshot()
+        except SQLAlchemyError as e:
+            print(f"Could not warm quote cache from snapshot: {e}")
+
+    from .services.history_buffer import init_history_buffer
+    init_history_buffer(app)
+
+    from .services.scheduler import init_scheduler
+    init_scheduler(app)
+
     return app
@@ -5,3 +5,4 @@ from .holding import Holding
 from .asset_history import AssetHistory
 from .portfolio_history import PortfolioHistory
 from .watchlist import Watchlist
+from .position import Position
@@ -21,6 +21,11 @@ class Asset(db.Model):
     sector          = db.Column(db.String(100), nullable=False)
     day_changeP     = db.Column(db.Float, default=0)
 
+    # last known quote, used to warm the cache on startup and when yfinance is unavailable
+    last_price      = db.Column(db.Float, nullable=True)
+    last_change     = db.Column(db.Float, nullable=True)
+    quote_updated_at = db.Column(db.DateTime, nullable=True)
+
     # relationships
     holdings       = db.relationship("Holding", back_populates="asset")
     history        = db.relationship("AssetHistory", back_populates="asset", cascade="all, delete-orphan")
@@ -40,4 +45,6 @@ class Asset(db.Model):
             "asset_type": self.asset_type,
             "sector": self.sector,
             "day_changeP": self.day_changeP,
+            "last_price": self.last_price,
+            "quote_updated_at": self.quote_updated_at.isoformat() if self.quote_updated_at else None,
         }
\ No newline at end of file
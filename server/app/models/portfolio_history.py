@@ -13,6 +13,9 @@ class PortfolioHistory(db.Model):
 
     portfolio = db.relationship('Portfolio', back_populates='history')
 
+    # One row per portfolio per day, so concurrent snapshot runs cannot duplicate a day
+    __table_args__ = (db.UniqueConstraint('fk_portfolio_history_portfolio_id', 'date', name='uq_portfolio_history_portfolio_date'),)
+
     def __init__(self, portfolio_id, value, date=None, balance=None):
         self.portfolio_id = portfolio_id
         self.value = value
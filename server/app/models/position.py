@@ -0,0 +1,48 @@
+######################################################
+#
+# A position is the running total of every holding
+# lot of one asset in a portfolio. It is maintained
+# by buy_asset and sell_asset and can be rebuilt from
+# lots and transactions with tools/rebuild_positions.
+#
+######################################################
+
+from app import db
+
+class Position(db.Model):
+    __tablename__   = "positions"
+
+    # primary key
+    id              = db.Column(db.Integer, primary_key=True)
+
+    # position data
+    portfolio_id    = db.Column(db.Integer, db.ForeignKey('portfolios.id', name="fk_positions_portfolio_id"), nullable=False)
+    asset_id        = db.Column(db.Integer, db.ForeignKey('assets.id', name="fk_positions_asset_id"), nullable=False)
+    quantity        = db.Column(db.Float, nullable=False, default=0.0)
+    total_cost      = db.Column(db.Float, nullable=False, default=0.0)
+    realized_pnl    = db.Column(db.Float, nullable=False, default=0.0)
+
+    # relationships
+    portfolio = db.relationship('Portfolio', backref='positions')
+    asset = db.relationship('Asset', backref='positions')
+
+    __table_args__ = (db.UniqueConstraint('portfolio_id', 'asset_id', name='uq_positions_portfolio_asset'),)
+
+    def __init__(self, portfolio_id, asset_id, quantity=0.0, total_cost=0.0, realized_pnl=0.0):
+        self.portfolio_id = portfolio_id
+        self.asset_id = asset_id
+        self.quantity = quantity
+        self.total_cost = total_cost
+        self.realized_pnl = realized_pnl
+
+    def serialize(self):
+        return {
+            "id": self.id,
+            "portfolio_id": self.portfolio_id,
+            "asset_id": self.asset_id,
+            "quantity": self.quantity,
+            "total_cost": self.total_cost,
+            "avg_cost": self.total_cost / self.quantity if self.quantity else 0.0,
+            "realized_pnl": self.realized_pnl,
+            "asset_symbol": self.asset.symbol if self.asset else None,
+        }
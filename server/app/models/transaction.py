@@ -39,13 +39,12 @@ class Transaction(db.Model):
         self.created_at = created_at or datetime.now(timezone.utc).isoformat()
         self.transaction_type = transaction_type
 
-    def serialize(self):
+    def serialize(self, asset_symbol=None):
         from app.models.holding import Holding
         from app.models.asset import Asset
         
-        # Get asset symbol through holding relationship
-        asset_symbol = None
-        if self.holding_id:
+        # Get asset symbol through holding relationship, unless the caller already knows it
+        if asset_symbol is None and self.holding_id:
             holding = Holding.query.get(self.holding_id)
             if holding and holding.asset:
                 asset_symbol = holding.asset.symbol
@@ -1,9 +1,23 @@
-from app.services.cache import cache
+from app.services.cache import cache, static_cache, negative_cache
+from app.services.circuit_breaker import market_data_breaker
+from app.services.search_index import search_index
+from app.services.history_buffer import history_buffer
+from app.services.price_store import price_store
+from app.services.movers_service import get_market_movers, get_movers_snapshot
 
 from ..models.asset import Asset
-from ..services.asset_service import fetch_asset_metadata, fetch_latest_prices, search_assets, get_asset_info
+from ..services.asset_service import (
+    fetch_latest_prices,
+    search_assets,
+    get_asset_info,
+    invalidate_static_metadata,
+    get_quote_flight_stats,
+)
 from .. import db
 
+from datetime import date
+
+import numpy as np
 from flask import request
 from sqlalchemy.exc import SQLAlchemyError
 from flask_restx import Namespace, Resource, fields
@@ -55,6 +69,8 @@ class AssetListResource(Resource):
                 return {"message": "Asset already exists"}, 400
 
             info = get_asset_info(symbol)
+            if info['name'] == "Unknown":
+                return {"error": f"Unknown symbol: {symbol}"}, 404
 
             new_asset = Asset(
                 symbol=symbol,
@@ -65,6 +81,7 @@ class AssetListResource(Resource):
             )
             db.session.add(new_asset)
             db.session.commit()
+            search_index.add(new_asset)
             return new_asset.serialize(), 201
 
         except SQLAlchemyError as e:
@@ -97,6 +114,7 @@ class AssetResource(Resource):
         try:
             asset = Asset.query.get(asset_id)
             if asset:
+                old_symbol = asset.symbol
                 if 'symbol' in data:
                     asset.symbol = data['symbol']
                 if 'name' in data:
@@ -107,6 +125,8 @@ class AssetResource(Resource):
                     asset.sector = data['sector']
 
                 db.session.commit()
+                invalidate_static_metadata(old_symbol, asset.symbol)
+                search_index.add(asset)
                 return asset.serialize(), 200
             else:
                 return {"error": "Asset not found"}, 404
@@ -119,8 +139,12 @@ class AssetResource(Resource):
         try:
             asset = Asset.query.get(asset_id)
             if asset:
+                symbol = asset.symbol
                 db.session.delete(asset)
                 db.session.commit()
+                invalidate_static_metadata(symbol)
+                search_index.remove(asset_id)
+                price_store.invalidate(asset_id)
                 return {"message": "Asset deleted successfully"}, 200
             else:
                 return {"error": "Asset not found"}, 404
@@ -139,6 +163,23 @@ class AssetPriceResource(Resource):
         except Exception as e:
             return {"error": str(e)}, 500
         
+@api_ns.route('/prices')
+class AssetPricesResource(Resource):
+    def get(self):
+        """
+        Returns the latest quotes for several symbols in one call.
+        Query parameter: symbols (comma separated)
+        Example: GET /assets/prices?symbols=AAPL,MSFT
+        """
+        symbols = [s.strip().upper() for s in request.args.get('symbols', '').split(',') if s.strip()]
+        if not symbols:
+            return {"error": "Symbols are required. Use ?symbols=AAPL,MSFT"}, 400
+
+        try:
+            return fetch_latest_prices(symbols), 200
+        except Exception as e:
+            return {"error": str(e)}, 500
+
 @api_ns.route('/gains')
 class AssetGainsResource(Resource):
     def get(self):
@@ -162,8 +203,10 @@ class AssetSearchResource(Resource):
     def get(self):
         """
         Search for assets by symbol or name.
-        Query parameter: q (search term)
+        Query parameters: q (search term), prices (default true)
         Returns assets matching the search term in symbol or name.
+        With prices=false only metadata is returned, without waiting on quotes;
+        prices can then be requested from /assets/prices.
         Example: GET /assets/search?q=AAPL
         """
         search_term = request.args.get('q', '').strip()
@@ -175,64 +218,120 @@ class AssetSearchResource(Resource):
             return {"error": "Search term must be at least 1 character"}, 400
         
         try:
-            results = search_assets(search_term)
+            with_prices = request.args.get('prices', 'true').lower() != 'false'
+            results = search_assets(search_term, with_prices=with_prices)
             return results, 200
             
         except Exception as e:
             return {"error": str(e)}, 500
 
+@api_ns.route('/history/buffer')
+class AssetHistoryBufferResource(Resource):
+    def get(self):
+        """Returns how many intraday prices are waiting to be written to asset_history."""
+        return history_buffer.stats(), 200
+
+    def post(self):
+        """Writes every buffered intraday price to asset_history now."""
+        try:
+            flushed = history_buffer.flush()
+            return {"flushed": flushed, **history_buffer.stats()}, 200
+        except Exception as e:
+            return {"error": str(e)}, 500
+
+@api_ns.route('/history')
+class AssetsHistoryResource(Resource):
+    def get(self):
+        """
+        Returns the price history of several assets aligned on the same dates.
+        Expects ?ids=1,2,3 and optional ?start= and ?end= (YYYY-MM-DD) and
+        ?fill=ffill to carry prices forward over dates an asset has none.
+        """
+        try:
+            asset_ids = [int(i) for i in request.args.get('ids', '').split(',') if i.strip()]
+            start, end = _history_range()
+        except ValueError:
+            return {"error": "ids must be integers and start/end dates in YYYY-MM-DD format"}, 400
+        if not asset_ids:
+            return {"error": "Query parameter 'ids' is required"}, 400
+
+        try:
+            assets = {a.id: a for a in Asset.query.filter(Asset.id.in_(asset_ids))}
+            missing = [asset_id for asset_id in asset_ids if asset_id not in assets]
+            if missing:
+                return {"error": f"Assets not found: {', '.join(map(str, missing))}"}, 404
+
+            dates, prices = price_store.read_aligned(
+                asset_ids, start=start, end=end, forward_fill=request.args.get('fill') == 'ffill'
+            )
+            return {
+                "dates": [str(day) for day in dates],
+                "series": {
+                    assets[asset_id].symbol: [None if np.isnan(p) else float(p) for p in prices[row]]
+                    for row, asset_id in enumerate(asset_ids)
+                },
+            }, 200
+
+        except SQLAlchemyError as e:
+            return {"error": str(e)}, 500
+
 @api_ns.route('/<int:asset_id>/history')
 class AssetHistoryResource(Resource):
     def get(self, asset_id):
-        """Returns the price history for a specific asset."""
+        """
+        Returns the price history for a specific asset.
+        Optional ?start= and ?end= (YYYY-MM-DD) limit the date range.
+        """
+        try:
+            start, end = _history_range()
+        except ValueError:
+            return {"error": "start and end must be dates in YYYY-MM-DD format"}, 400
+
         try:
-            from ..models.asset_history import AssetHistory
-            
             asset = Asset.query.get(asset_id)
             if not asset:
                 return {"error": "Asset not found"}, 404
-            
-            history = AssetHistory.query.filter_by(asset_id=asset_id).order_by(AssetHistory.date.asc()).all()
-            return [entry.serialize() for entry in history], 200
+
+            dates, prices = price_store.read(asset_id, start=start, end=end)
+            return [
+                {"asset_id": asset_id, "asset_symbol": asset.symbol, "price": float(price), "date": str(day)}
+                for day, price in zip(dates, prices)
+            ], 200
             
         except SQLAlchemyError as e:
             return {"error": str(e)}, 500
+
+def _history_range():
+    """Parses ?start= and ?end= into dates (None when absent)."""
+    start = request.args.get('start')
+    end = request.args.get('end')
+    return (
+        date.fromisoformat(start) if start else None,
+        date.fromisoformat(end) if end else None,
+    )
         
 
-#market movers list (static)
-watchlist = [
-    "WK", "ATEC", "TILE", "BIO", "IRTC", "APPF", "RDDT", "AUPH", "RKT", "COOP",  # Gainers
-    "FLR", "NSP", "ENVX", "LUMN", "EMN", "SATS", "INOD", "RIOT", "COIN", "NWL",  # Losers
-    "NVDA", "AMZN", "VALE", "LCID", "SOFI", "TSLA", "AAPL", "HOOD", "NIO", "AMD"  # Actives
-]
 @api_ns.route('/market_movers')
 class MarketMoversResource(Resource):
     def get(self):
         """
-        Returns top 3 gainers and top 2 losers from the static market movers list.
+        Returns top 3 gainers and top 2 losers from the latest market movers snapshot.
         """
         try:
-            movers = []
-
-            for symbol in watchlist:
-                try:
-                    info = get_asset_info(symbol) # gets info from the get_asset_info function
-                    if info and "day_changeP" in info:
-                        movers.append({
-                            "symbol": symbol,
-                            "name": info.get("name", symbol),
-                            "price": info.get("price"),
-                            "day_changeP": info.get("day_changeP")
-                        })
-                except Exception:
-                    continue  # Skip if info fails
+            return get_market_movers(), 200
 
-            sorted_movers = sorted(movers, key=lambda x: x["day_changeP"], reverse=True)
-            top_3_gainers = sorted_movers[:3]
-            top_2_losers = sorted_movers[-2:]
-
-            return top_3_gainers + top_2_losers, 200
+        except Exception as e:
+            return {"error": str(e)}, 500
 
+@api_ns.route('/market_movers/snapshot')
+class MarketMoversSnapshotResource(Resource):
+    def get(self):
+        """
+        Returns the latest ranked snapshot of gainers, losers and most active
+        symbols over the asset universe, with the time it was computed.
+        """
+        try:
+            return get_movers_snapshot(), 200
         except Exception as e:
             return {"error": str(e)}, 500
 
@@ -241,4 +340,22 @@ class AssetCacheResource(Resource):
     def get(self):
         """Returns the current contents of the asset price cache."""
         # Convert cache to a regular dict for JSON serialization
-        return {k: dict(v) if hasattr(v, 'items') else v for k, v in cache.items()}, 200
\ No newline at end of file
+        return {k: dict(v) if hasattr(v, 'items') else v for k, v in cache.items()}, 200
+
+@api_ns.route('/cache/stats')
+class AssetCacheStatsResource(Resource):
+    def get(self):
+        """Returns hit and miss counts for the asset price cache backend, plus the static metadata and unknown-symbol caches."""
+        return {**cache.stats(), "static": static_cache.stats(), "negative": negative_cache.stats()}, 200
+
+@api_ns.route('/quotes/stats')
+class AssetQuoteStatsResource(Resource):
+    def get(self):
+        """Returns counters for quote fetches and calls coalesced onto an outstanding fetch."""
+        return get_quote_flight_stats(), 200
+
+@api_ns.route('/market_data/status')
+class MarketDataStatusResource(Resource):
+    def get(self):
+        """Returns the state and trip counts of the market data circuit breaker."""
+        return market_data_breaker.status(), 200
@@ -1,11 +1,9 @@
 from .. import db
 from ..models.holding import Holding
-from ..services.asset_service import fetch_latest_price
-from ..services.holding_service import get_asset_return
+from ..services.position_service import format_holdings, get_positions, rebuild_positions
 
 from flask import request
 from sqlalchemy.exc import SQLAlchemyError
-from sqlalchemy.orm import joinedload
 from flask_restx import Namespace, Resource, fields
 
 api_ns = Namespace('holdings', description='Holding operations')
@@ -50,6 +48,8 @@ class HoldingResource(Resource):
 
         try:
             db.session.delete(holding)
+            db.session.flush()
+            rebuild_positions(holding.portfolio_id, holding.asset_id)
             db.session.commit()
             return {"message": "Holding deleted successfully"}, 200
         except SQLAlchemyError as e:
@@ -59,55 +59,9 @@ class HoldingResource(Resource):
 @api_ns.route('/portfolio/<int:portfolio_id>')
 class HoldingsByPortfolioResource(Resource):
     def get(self, portfolio_id):
-        """Returns all holdings for a specific portfolio. Merged by asset with batch price fetching."""
+        """Returns all holdings for a specific portfolio, merged by asset from one aggregated query."""
         try:
-            holdings = Holding.query.options(joinedload(Holding.asset)).filter_by(portfolio_id=portfolio_id).filter(Holding.quantity > 0).all()
-            
-            if not holdings:
-                return {}, 200
-            
-            # Get unique symbols for batch price fetching
-            symbols = list(set(h.asset.symbol for h in holdings))
-            
-            # Batch fetch latest prices for all symbols at once
-            from ..services.asset_service import fetch_latest_prices
-            price_data = fetch_latest_prices(symbols)
-            
-            merged_holdings = {}
-            for h in holdings:
-                symbol = h.asset.symbol
-                if symbol not in merged_holdings:
-                    # Get price from batch data or fallback to stored price
-                    current_price = None
-                    if symbol in price_data:
-                        current_price = price_data[symbol].get('price')
-                    
-                    # Fallback to stored asset price if batch fetch failed
-                    if current_price is None:
-                        current_price = h.asset.current_price if hasattr(h.asset, 'current_price') else 100.0
-                    
-                    merged_holdings[symbol] = {
-                        'quantity': h.quantity,
-                        'current_price': current_price,
-                        'asset_name': h.asset.name,
-                        'asset_symbol': h.asset.symbol,
-                        'asset_id': h.asset.id,
-                        'asset_type': h.asset.asset_type,
-                        'asset_sector': h.asset.sector,
-                        'asset_dayChangeP': price_data.get(symbol, {}).get('day_changeP') if symbol in price_data else None,
-                        'purchase_price': h.purchase_price,
-                        'asset_return': get_asset_return(portfolio_id, h.asset.id) if h.asset else None,
-                    }
-                else:
-                    merged_holdings[symbol]['quantity'] += h.quantity
-                    # Weight average purchase price when merging
-                    total_qty = merged_holdings[symbol]['quantity']
-                    merged_holdings[symbol]['purchase_price'] = (
-                        (merged_holdings[symbol]['purchase_price'] * (total_qty - h.quantity) + 
-                         h.purchase_price * h.quantity) / total_qty
-                    )
-            
-            return merged_holdings, 200
+            return format_holdings(get_positions(portfolio_id)), 200
 
         except SQLAlchemyError as e:
             print(f"Error fetching holdings: {e}")
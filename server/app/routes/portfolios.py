@@ -3,12 +3,13 @@ from ..models.portfolio import Portfolio
 from ..models.portfolio_history import PortfolioHistory
 
 from ..services.portfolio_service import backfill_portfolio_history
-from ..services.holding_service import get_portfolio_value, get_portfolio_return
+from ..services.dashboard_service import DASHBOARD_HISTORY_DAYS, DASHBOARD_TRANSACTION_LIMIT, build_dashboard
+from ..services.valuation_service import value_portfolio, value_portfolios
 
 from flask import request
 from sqlalchemy.exc import SQLAlchemyError
 from flask_restx import Namespace, Resource, fields
-from datetime import datetime, timezone
+from datetime import date, datetime, timezone
 
 api_ns = Namespace('portfolios', description='Portfolio operations')
 
@@ -50,6 +51,24 @@ class PortfolioListResource(Resource):
             db.session.rollback()
             return {"error": str(e)}, 500
 
+@api_ns.route('/valuations')
+class PortfolioValuationsResource(Resource):
+    def get(self):
+        """
+        Returns value, return, cost and P&L for every portfolio, or for the
+        portfolios in ?ids=1,2,3, computed in one pass.
+        """
+        ids = request.args.get('ids')
+        try:
+            portfolio_ids = [int(i) for i in ids.split(',') if i.strip()] if ids else None
+        except ValueError:
+            return {"error": "ids must be a comma-separated list of integers"}, 400
+
+        try:
+            return value_portfolios(portfolio_ids), 200
+        except SQLAlchemyError as e:
+            return {"error": str(e)}, 500
+
 @api_ns.route('/<int:portfolio_id>')
 class PortfolioResource(Resource):
     def get(self, portfolio_id):
@@ -58,8 +77,9 @@ class PortfolioResource(Resource):
             portfolio = Portfolio.query.get(portfolio_id)
             if portfolio:
                 portfolio_data = portfolio.serialize()
-                portfolio_data['value'] = get_portfolio_value(portfolio_id)
-                portfolio_data['return'] = get_portfolio_return(portfolio_id)
+                valuation = value_portfolio(portfolio_id)
+                portfolio_data['value'] = valuation['value']
+                portfolio_data['return'] = valuation['return']
                 return portfolio_data, 200
             else:
                 return {"error": "Portfolio not found"}, 404
@@ -102,6 +122,25 @@ class PortfolioResource(Resource):
             db.session.rollback()
             return {"error": str(e)}, 500
 
+@api_ns.route('/<int:portfolio_id>/dashboard')
+class PortfolioDashboardResource(Resource):
+    def get(self, portfolio_id):
+        """
+        Returns the whole Dashboard payload for a portfolio in one response.
+        Optional ?history_days= and ?transactions= limit how much history and
+        how many recent transactions are included.
+        """
+        try:
+            history_days = request.args.get('history_days', DASHBOARD_HISTORY_DAYS, type=int)
+            transaction_limit = request.args.get('transactions', DASHBOARD_TRANSACTION_LIMIT, type=int)
+
+            dashboard = build_dashboard(portfolio_id, history_days=history_days, transaction_limit=transaction_limit)
+            if dashboard is None:
+                return {"error": "Portfolio not found"}, 404
+            return dashboard, 200
+        except SQLAlchemyError as e:
+            return {"error": str(e)}, 500
+
 @api_ns.route('/<int:portfolio_id>/history')
 class PortfolioHistoryResource(Resource):
     def get(self, portfolio_id):
@@ -115,6 +154,29 @@ class PortfolioHistoryResource(Resource):
         except SQLAlchemyError as e:
             return {"error": str(e)}, 500
 
+@api_ns.route('/<int:portfolio_id>/backfill')
+class PortfolioBackfillResource(Resource):
+    @api_ns.expect(portfolio_input_models['backfill'])
+    def post(self, portfolio_id):
+        """
+        Fills in missing daily history for a portfolio and its assets.
+        Expects optional JSON with 'start' (YYYY-MM-DD).
+        """
+        data = request.get_json(silent=True) or {}
+        try:
+            start = date.fromisoformat(data['start']) if data.get('start') else None
+        except ValueError:
+            return {"error": "start must be a date in YYYY-MM-DD format"}, 400
+
+        try:
+            result = backfill_portfolio_history(portfolio_id, start=start)
+            if result is None:
+                return {"error": "Portfolio not found"}, 404
+            return result, 200
+        except SQLAlchemyError as e:
+            db.session.rollback()
+            return {"error": str(e)}, 500
+
 @api_ns.route('/<int:portfolio_id>/transactions')
 class PortfolioTransactionsResource(Resource):
     def get(self, portfolio_id):
@@ -1,9 +1,11 @@
 from .. import db
 from ..models.transaction import Transaction
 from ..models.asset import Asset
+from ..models.portfolio import Portfolio
 from ..models.holding import Holding
-from ..services.asset_service import fetch_latest_prices, fetch_latest_price, update_asset_history
-from ..services.holding_service import buy_asset, sell_asset
+from ..services.asset_service import fetch_latest_prices, fetch_latest_price
+from ..services.history_buffer import history_buffer
+from ..services.holding_service import buy_asset, sell_asset, execute_trades
 
 from flask import request
 from sqlalchemy.exc import SQLAlchemyError
@@ -18,6 +20,14 @@ transaction_input_models = {
         'quantity': fields.Float(required=True),
         'transaction_type': fields.String(required=True)
     }),
+    'batch': api_ns.model('TransactionBatch', {
+        'trades': fields.List(fields.Nested(api_ns.model('TransactionBatchItem', {
+            'portfolio_id': fields.Integer(required=True),
+            'asset_id': fields.Integer(required=True),
+            'quantity': fields.Float(required=True),
+            'transaction_type': fields.String(required=True)
+        })), required=True)
+    }),
     'update': api_ns.model('TransactionUpdate', {
         'quantity': fields.Float(required=False),
         'price': fields.Float(required=False),
@@ -50,7 +60,11 @@ class TransactionListResource(Resource):
         
         try:
             latest_price = fetch_latest_price(data['asset_id'])
-            update_asset_history(data['asset_id'], latest_price, date.today())
+            if latest_price is None:
+                if Asset.query.get(data['asset_id']) is None:
+                    return {"error": "Asset not found"}, 404
+                return {"error": "No price available"}, 503
+            history_buffer.record(data['asset_id'], latest_price, date.today())
         
             if data['transaction_type'].lower() == 'sell':
                 transactions = sell_asset(data['portfolio_id'],data['asset_id'], data['quantity'], latest_price)
@@ -63,6 +77,110 @@ class TransactionListResource(Resource):
             db.session.rollback()
             return {"error": str(e)}, 500
 
+@api_ns.route('/batch')
+class TransactionBatchResource(Resource):
+    @api_ns.expect(transaction_input_models['batch'])
+    def post(self):
+        """
+        Buys or sells several assets at once.
+        Expects JSON with 'trades', a list of {portfolio_id, asset_id, quantity, transaction_type}.
+        All trades are validated and priced first, then executed in order in one
+        database transaction: either every trade is applied or none is.
+        """
+        data = request.get_json()
+        trades = data.get('trades') if isinstance(data, dict) else None
+        if not isinstance(trades, list) or not trades:
+            return {"error": "Expected a non-empty 'trades' list"}, 400
+
+        try:
+            errors = {}
+            for index, trade in enumerate(trades):
+                error = _validate_trade(trade)
+                if error:
+                    errors[index] = error
+
+            # Assets and portfolios of the well-formed trades, one query each
+            valid = [trade for index, trade in enumerate(trades) if index not in errors]
+            asset_ids = {trade['asset_id'] for trade in valid}
+            portfolio_ids = {trade['portfolio_id'] for trade in valid}
+            assets = {a.id: a for a in Asset.query.filter(Asset.id.in_(asset_ids))}
+            portfolios = {pid for (pid,) in db.session.query(Portfolio.id).filter(Portfolio.id.in_(portfolio_ids))}
+
+            for index, trade in enumerate(trades):
+                if index in errors:
+                    continue
+                if trade['asset_id'] not in assets:
+                    errors[index] = "Asset not found"
+                elif trade['portfolio_id'] not in portfolios:
+                    errors[index] = "Portfolio not found"
+
+            errors = [{"index": index, "error": errors[index]} for index in sorted(errors)]
+            if errors:
+                return {"error": "Invalid trades", "results": errors}, 400
+
+            # One quote batch for every asset traded
+            symbols = list({assets[t['asset_id']].symbol.upper() for t in trades})
+            quotes = fetch_latest_prices(symbols)
+
+            priced = []
+            for index, trade in enumerate(trades):
+                quote = quotes.get(assets[trade['asset_id']].symbol.upper())
+                if not quote or quote.get('price') is None:
+                    errors.append({"index": index, "error": "No price available"})
+                    continue
+                priced.append({
+                    'portfolio_id': trade['portfolio_id'],
+                    'asset_id': trade['asset_id'],
+                    'quantity': float(trade['quantity']),
+                    'transaction_type': trade['transaction_type'].lower(),
+                    'price': quote['price'],
+                })
+            if errors:
+                return {"error": "Could not price trades", "results": errors}, 400
+
+            results = execute_trades(priced)
+
+            # Today's price per asset is written behind the trades by the history buffer
+            today = date.today()
+            for trade in priced:
+                history_buffer.record(trade['asset_id'], trade['price'], today)
+
+            return [
+                {
+                    "index": index,
+                    "portfolio_id": trade['portfolio_id'],
+                    "asset_id": trade['asset_id'],
+                    "transaction_type": trade['transaction_type'],
+                    "quantity": trade['quantity'],
+                    "price": trade['price'],
+                    "transactions": [t.serialize(asset_symbol=assets[trade['asset_id']].symbol) for t in transactions],
+                }
+                for index, (trade, transactions) in enumerate(zip(priced, results))
+            ], 201
+
+        except ValueError as e:
+            return {"error": str(e)}, 400
+        except Exception as e:
+            db.session.rollback()
+            return {"error": str(e)}, 500
+
+def _validate_trade(trade):
+    """Returns an error message for a malformed trade, or None."""
+    if not isinstance(trade, dict):
+        return "Trade must be an object"
+    required_fields = ['portfolio_id', 'asset_id', 'quantity', 'transaction_type']
+    missing = [field for field in required_fields if field not in trade]
+    if missing:
+        return f"Missing required fields: {', '.join(missing)}"
+    for field in ('portfolio_id', 'asset_id'):
+        if not isinstance(trade[field], int) or isinstance(trade[field], bool):
+            return f"{field} must be an integer"
+    if str(trade['transaction_type']).lower() not in ('buy', 'sell'):
+        return "transaction_type must be 'buy' or 'sell'"
+    if not isinstance(trade['quantity'], (int, float)) or isinstance(trade['quantity'], bool) or trade['quantity'] <= 0:
+        return "quantity must be a positive number"
+    return None
+
 @api_ns.route('/portfolio/<int:portfolio_id>')
 class PortfolioTransactionsResource(Resource):
     def get(self, portfolio_id):
@@ -5,6 +5,7 @@ from ..services.watchlist_service import (
     add_to_watchlist,
     remove_from_watchlist_by_asset,
     get_watchlist_by_portfolio,
+    format_watchlist,
 )
 from ..services.asset_service import fetch_latest_prices
 
@@ -53,17 +54,7 @@ class WatchlistByPortfolioResource(Resource):
             price_data = fetch_latest_prices(symbols) if symbols else {}
             
             # Enhance watchlist items with current price data
-            enhanced_items = []
-            for item in watchlist_items:
-                item_data = item.serialize()
-                if item.asset and item.asset.symbol in price_data:
-                    price_info = price_data[item.asset.symbol]
-                    item_data['current_price'] = price_info.get('price')
-                    item_data['day_change'] = price_info.get('day_change')
-                    item_data['day_changeP'] = price_info.get('day_changeP')
-                enhanced_items.append(item_data)
-            
-            return enhanced_items, 200
+            return format_watchlist(watchlist_items, price_data), 200
 
         except ValueError as e:
             return {"error": str(e)}, 404
@@ -1,12 +1,21 @@
-import yfinance as yf
 from datetime import datetime, timezone
+from concurrent.futures import Future, ThreadPoolExecutor, wait, FIRST_COMPLETED
+import threading
 import random
+import time
+
+from flask import current_app, has_app_context
+from sqlalchemy import bindparam, update
 
 from app import db
 from app.models.asset import Asset
-from app.models.asset_history import AssetHistory
+from app.models.holding import Holding
+from app.models.watchlist import Watchlist
 
-from app.services.cache import cache
+from app.services.cache import cache, static_cache, negative_cache
+from app.services.circuit_breaker import CircuitOpenError, market_data_breaker
+from app.services.market_data import get_provider
+from app.services.search_index import search_index
 
 # Top 10 most popular sectors for fallback when sector is N/A
 POPULAR_SECTORS = [
@@ -22,14 +31,368 @@ POPULAR_SECTORS = [
     "Basic Materials"
 ]
 
+# Maximum number of symbols requested in a single bulk quote call
+QUOTE_BATCH_SIZE = 50
+
+# Parallel fetch settings: worker threads shared by all requests,
+# seconds allowed per symbol and seconds allowed for the whole call
+QUOTE_FETCH_WORKERS = 8
+QUOTE_FETCH_TIMEOUT = 5.0
+QUOTE_FETCH_DEADLINE = 10.0
+
+_executor = None
+_executor_lock = threading.Lock()
+
+def _get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=QUOTE_FETCH_WORKERS, thread_name_prefix="quote-fetch")
+        return _executor
+
+def fetch_parallel(symbols, fetch=None, timeout=None, deadline=None):
+    """
+    Runs fetch(symbol) for every symbol on the shared bounded thread pool.
+    A symbol is given up on once it has been running for longer than
+    timeout seconds, and the whole call returns once deadline seconds
+    have passed. Returns (results, missing) where results maps each symbol
+    that finished to its value and missing lists the symbols that failed
+    or ran out of time.
+    """
+    fetch = fetch or get_asset_info
+    timeout = QUOTE_FETCH_TIMEOUT if timeout is None else timeout
+    deadline = QUOTE_FETCH_DEADLINE if deadline is None else deadline
+
+    started = {}
+
+    def run(symbol):
+        started[symbol] = time.monotonic()
+        return fetch(symbol)
+
+    executor = _get_executor()
+    futures = {executor.submit(run, symbol): symbol for symbol in dict.fromkeys(symbols)}
+    end = time.monotonic() + deadline
+
+    results = {}
+    missing = []
+    pending = set(futures)
+
+    while pending:
+        now = time.monotonic()
+        if now >= end:
+            break
+
+        # Wake up at the deadline or when the oldest running fetch runs out of time
+        wake = end
+        for future in pending:
+            symbol = futures[future]
+            if symbol in started:
+                wake = min(wake, started[symbol] + timeout)
+
+        done, pending = wait(pending, timeout=max(wake - now, 0.01), return_when=FIRST_COMPLETED)
+
+        for future in done:
+            symbol = futures[future]
+            try:
+                results[symbol] = future.result()
+            except Exception as e:
+                print(f"Error fetching {symbol}: {e}")
+                missing.append(symbol)
+
+        now = time.monotonic()
+        for future in list(pending):
+            symbol = futures[future]
+            if symbol in started and now - started[symbol] >= timeout:
+                print(f"Timed out fetching {symbol} after {timeout}s")
+                missing.append(symbol)
+                pending.discard(future)
+
+    for future in pending:
+        future.cancel()
+        missing.append(futures[future])
+
+    if missing:
+        print(f"Parallel fetch missing {len(missing)} of {len(futures)} symbols: {', '.join(missing)}")
+
+    return results, missing
+
 def fetch_latest_prices(symbols):
-    uncached_symbols = [s for s in symbols if s not in cache]
-    
-    for symbol in uncached_symbols:
-        cache[symbol] = fetch_asset_metadata(symbol)
-        print(f"Cached metadata for: {symbol}")
+    """
+    Returns quotes for the given symbols. Fresh and stale cached quotes are
+    returned right away (stale ones are refreshed in the background); only
+    symbols with no cached quote at all are fetched before returning.
+    Sector and asset type are added from the static metadata tier.
+    """
+    quotes, missing = _read_cached_quotes(symbols)
+
+    if missing:
+        quotes.update(_download_quotes(missing))
+
+        # Serve the persisted snapshot for anything yfinance could not price
+        unavailable = [symbol for symbol in missing if not _has_price(quotes.get(symbol))]
+        if unavailable and has_app_context():
+            quotes.update(load_quote_snapshot(unavailable))
+
+    static = get_static_metadata(list(quotes), fetch_missing=False)
+
+    results = {}
+    for symbol in symbols:
+        if symbol in quotes:
+            fields = static.get(symbol, {})
+            results[symbol] = {
+                **quotes[symbol],
+                "sector": fields.get("sector", "N/A"),
+                "asset_type": fields.get("asset_type", "stock"),
+            }
+    return results
+
+def _read_cached_quotes(symbols):
+    """
+    Looks symbols up in the cache and schedules a background refresh for
+    the stale ones. Returns (quotes, missing).
+    """
+    quotes = {}
+    stale = {}
+    missing = []
+    for symbol in dict.fromkeys(symbols):
+        quote, is_stale = cache.get_entry(symbol)
+        if quote is None:
+            missing.append(symbol)
+            continue
+        quotes[symbol] = quote
+        if is_stale:
+            stale[symbol] = quote
+
+    if stale:
+        _schedule_refresh(stale)
+
+    return quotes, missing
+
+# Outstanding quote fetches in this process, symbol -> Future
+_inflight = {}
+_inflight_lock = threading.Lock()
+_flight_stats = {"fetched": 0, "coalesced": 0}
+
+def _download_quotes(symbols):
+    """
+    Fetches quotes for symbols missing from the cache. A symbol that is
+    already being fetched by another caller is not fetched again; this
+    call waits for the outstanding fetch instead.
+    """
+    leading = []
+    waiting = {}
+    with _inflight_lock:
+        for symbol in dict.fromkeys(symbols):
+            future = _inflight.get(symbol)
+            if future is None:
+                _inflight[symbol] = Future()
+                leading.append(symbol)
+            else:
+                waiting[symbol] = future
+        _flight_stats["fetched"] += len(leading)
+        _flight_stats["coalesced"] += len(waiting)
+
+    quotes = {}
+    try:
+        if leading:
+            quotes = _fetch_and_cache_quotes(leading)
+    finally:
+        with _inflight_lock:
+            for symbol in leading:
+                _inflight.pop(symbol).set_result(quotes.get(symbol))
+
+    for symbol, future in waiting.items():
+        try:
+            quote = future.result(timeout=QUOTE_FETCH_DEADLINE)
+        except Exception:
+            quote = None
+        if quote is not None:
+            quotes[symbol] = quote
+
+    return quotes
+
+def _fetch_and_cache_quotes(symbols):
+    """
+    Fetches quotes with the batched path, falls back to the single-symbol
+    path for anything the bulk download missed, and stores them in the cache.
+    Quotes without a price are dropped, so callers fall back to the snapshot.
+    """
+    quotes = fetch_batch_quotes(symbols)
+
+    leftover = [symbol for symbol in symbols if symbol not in quotes and not is_unknown_symbol(symbol)]
+    if leftover and not market_data_breaker.is_open():
+        fetched, _ = fetch_parallel(leftover, fetch=fetch_asset_metadata)
+        quotes.update(fetched)
+
+    # A quote without a price would hide the persisted snapshot for the whole TTL
+    quotes = {symbol: quote for symbol, quote in quotes.items() if _has_price(quote)}
+
+    if quotes:
+        cache.update(quotes)
+        print(f"Cached metadata for: {', '.join(quotes)}")
+        if has_app_context():
+            persist_quote_snapshot(quotes)
+
+    return quotes
+
+def _has_price(quote):
+    return quote is not None and quote.get("price") is not None
+
+def refresh_quotes(symbols, batch_size=QUOTE_BATCH_SIZE):
+    """
+    Fetches fresh quotes for symbols regardless of what is cached,
+    batch_size symbols at a time. Returns the quotes that were fetched.
+    """
+    quotes = {}
+    for i in range(0, len(symbols), batch_size):
+        quotes.update(_download_quotes(symbols[i:i + batch_size]))
+    return quotes
+
+def get_tracked_symbols():
+    """Returns the distinct symbols held (quantity > 0) or watched in any portfolio."""
+    held = db.session.query(Asset.symbol).join(Holding, Holding.asset_id == Asset.id).filter(Holding.quantity > 0)
+    watched = db.session.query(Asset.symbol).join(Watchlist, Watchlist.asset_id == Asset.id)
+    return sorted(symbol for (symbol,) in held.union(watched).all())
+
+def refresh_tracked_quotes(batch_size=QUOTE_BATCH_SIZE):
+    """Refreshes quotes for every held or watched symbol. Run by the scheduler."""
+    symbols = get_tracked_symbols()
+    quotes = refresh_quotes(symbols, batch_size=batch_size)
+    print(f"Refreshed {len(quotes)} of {len(symbols)} tracked quotes")
+    return quotes
+
+def persist_quote_snapshot(quotes):
+    """
+    Saves price, change and fetch time of each quote on its asset row in
+    one executemany UPDATE. Uses its own connection so the caller's
+    session is left untouched.
+    """
+    rows = []
+    for symbol, quote in quotes.items():
+        if quote.get("price") is None:
+            continue
+        rows.append({
+            "b_symbol": symbol,
+            "last_price": quote["price"],
+            "last_change": quote.get("day_change"),
+            "day_changeP": quote.get("day_changeP"),
+            "quote_updated_at": _parse_update_time(quote.get("update_time")),
+        })
+    if not rows:
+        return
+
+    table = Asset.__table__
+    statement = (
+        update(table)
+        .where(table.c.symbol == bindparam("b_symbol"))
+        .values(
+            last_price=bindparam("last_price"),
+            last_change=bindparam("last_change"),
+            day_changeP=bindparam("day_changeP"),
+            quote_updated_at=bindparam("quote_updated_at"),
+        )
+    )
+    try:
+        with db.engine.begin() as conn:
+            conn.execute(statement, rows)
+    except Exception as e:
+        print(f"Error persisting quote snapshot: {e}")
+
+def load_quote_snapshot(symbols=None):
+    """
+    Returns the persisted quotes for symbols (all assets when None),
+    in the same shape as the quote cache.
+    """
+    query = Asset.query.filter(Asset.last_price.isnot(None))
+    if symbols is not None:
+        query = query.filter(Asset.symbol.in_(symbols))
+
+    return {
+        asset.symbol: {
+            "price": asset.last_price,
+            "day_change": asset.last_change or 0,
+            "day_changeP": asset.day_changeP or 0,
+            "update_time": asset.quote_updated_at.replace(tzinfo=timezone.utc).isoformat() if asset.quote_updated_at else None,
+        }
+        for asset in query.all()
+    }
+
+def warm_cache_from_snapshot():
+    """
+    Loads the persisted quotes into the cache on startup. They are stored as
+    stale, so they are served right away and refreshed on first use.
+    Symbols the shared cache already holds are left alone.
+    """
+    snapshot = load_quote_snapshot()
+    cold = {symbol: quote for symbol, quote in snapshot.items() if symbol not in cache}
+    if cold:
+        cache.update(cold, stored_at=time.time() - cache.soft_ttl - 1)
+    print(f"Warmed quote cache with {len(cold)} persisted quotes")
+
+def _parse_update_time(value):
+    if not value:
+        return datetime.now(timezone.utc).replace(tzinfo=None)
+    return datetime.fromisoformat(value).astimezone(timezone.utc).replace(tzinfo=None)
+
+def get_quote_flight_stats():
+    """Returns how many symbols were fetched and how many callers joined an outstanding fetch."""
+    with _inflight_lock:
+        return {**_flight_stats, "inflight": len(_inflight)}
 
-    return {symbol: cache[symbol] for symbol in symbols if symbol in cache}
+# Symbols with a background refresh queued or running in this process
+_refreshing = set()
+_refresh_lock = threading.Lock()
+_refresh_executor = None
+
+def _schedule_refresh(stale):
+    """
+    Queues one background refresh for the stale quotes that are not
+    already being refreshed.
+    """
+    global _refresh_executor
+    app = current_app._get_current_object() if has_app_context() else None
+    with _refresh_lock:
+        symbols = [symbol for symbol in stale if symbol not in _refreshing]
+        if not symbols:
+            return
+        _refreshing.update(symbols)
+        if _refresh_executor is None:
+            _refresh_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="quote-refresh")
+
+    _refresh_executor.submit(_refresh_quotes, {symbol: stale[symbol] for symbol in symbols}, app)
+
+def _refresh_quotes(stale, app=None):
+    # Runs in the app context when there is one, so the refreshed quotes are persisted too
+    try:
+        if app is not None:
+            with app.app_context():
+                _download_quotes(list(stale))
+        else:
+            _download_quotes(list(stale))
+    except Exception as e:
+        print(f"Error refreshing quotes for {', '.join(stale)}: {e}")
+    finally:
+        with _refresh_lock:
+            _refreshing.difference_update(stale)
+
+def fetch_batch_quotes(symbols):
+    """
+    Fetches quotes for many symbols with one bulk provider call per chunk
+    of QUOTE_BATCH_SIZE symbols. Returns a dict of price fields keyed by
+    symbol, leaving out symbols that had no data.
+    """
+    quotes = {}
+    for i in range(0, len(symbols), QUOTE_BATCH_SIZE):
+        chunk = symbols[i:i + QUOTE_BATCH_SIZE]
+        try:
+            quotes.update(market_data_breaker.call(get_provider().get_quotes, chunk))
+        except CircuitOpenError as e:
+            print(f"Skipping quote download for {len(chunk)} symbols: {e}")
+            break
+        except Exception as e:
+            print(f"Error downloading quotes for {chunk}: {e}")
+
+    return quotes
 
 def fetch_latest_price(asset_id):
     """
@@ -42,129 +405,217 @@ def fetch_latest_price(asset_id):
 
     symbol = asset.symbol.upper()
 
-    if symbol in cache:
-        return cache[symbol]['price']
-    else:
-        cache[symbol] = fetch_asset_metadata(symbol)
-        print(f"Cached metadata for: {symbol}")
-    
-    return cache[symbol]['price']
+    quote = fetch_latest_prices([symbol]).get(symbol)
+    return quote['price'] if quote else None
 
-def update_asset_history(asset_id, price, date):
+def get_static_metadata(symbols, fetch_missing=True, cache_quotes=True):
     """
-    Updates the asset_history table for the given asset,date and price.
+    Returns name, sector and asset type for each symbol.
+    Looks in the static cache, then the assets table, then (when
+    fetch_missing is set) yfinance. Unless cache_quotes is cleared, the
+    yfinance call also fills the quote cache, so the price is not
+    downloaded a second time.
     """
-    history = AssetHistory.query.filter_by(asset_id=asset_id, date=date).first()
-    if history:
-        history.price = price
-    else:
-        history = AssetHistory(asset_id=asset_id, price=price, date=date)
-        db.session.add(history)
-    db.session.commit()
+    static = {}
+    missing = []
+    for symbol in dict.fromkeys(symbols):
+        fields = static_cache.get(symbol)
+        if fields is None:
+            missing.append(symbol)
+        else:
+            static[symbol] = fields
 
-def fetch_asset_metadata(symbol):
+    if missing and has_app_context():
+        from_db = {
+            asset.symbol: _static_from_asset(asset)
+            for asset in Asset.query.filter(Asset.symbol.in_(missing)).all()
+        }
+        if from_db:
+            static_cache.update(from_db)
+            static.update(from_db)
+            missing = [symbol for symbol in missing if symbol not in from_db]
+
+    if missing and fetch_missing:
+        # Symbols recently found to be unknown are answered without a provider call
+        for symbol in missing:
+            if is_unknown_symbol(symbol):
+                static[symbol] = dict(UNKNOWN_STATIC)
+        missing = [symbol for symbol in missing if symbol not in static]
+
+    if missing and fetch_missing and not market_data_breaker.is_open():
+        infos, _ = fetch_parallel(missing, fetch=_fetch_info)
+        quotes = {}
+        for symbol, (fields, quote) in infos.items():
+            static[symbol] = fields
+            if fields["name"] == "Unknown":
+                negative_cache[symbol] = True
+            else:
+                static_cache[symbol] = fields
+                if _has_price(quote):
+                    quotes[symbol] = quote
+        if quotes and cache_quotes:
+            cache.update(quotes)
+
+    return static
+
+def get_asset_metadata(symbols, with_prices=True):
     """
-    Fetches metadata like sector and type from yfinance.
+    Returns the static fields of each symbol, merged with its latest
+    price fields when with_prices is set.
     """
-    ticker = yf.Ticker(symbol)
-    info = ticker.info
+    static = get_static_metadata(symbols)
+
+    quotes = {}
+    if with_prices:
+        known = [symbol for symbol, fields in static.items() if fields["name"] != "Unknown"]
+        quotes = fetch_latest_prices(known)
 
-    price = info.get("regularMarketPrice", 0)
-    sector = info.get("sector", "N/A")
-    asset_type = info.get("quoteType", "stock")
-    day_change = info.get("regularMarketChange", 0)
-    day_changeP = info.get("regularMarketChangePercent", 0)
+    metadata = {}
+    for symbol, fields in static.items():
+        metadata[symbol] = {**quotes.get(symbol, {}), **fields}
+    return metadata
 
+def invalidate_static_metadata(*symbols):
+    """
+    Drops symbols from the static and negative caches. Call after the
+    asset row change is committed, so a concurrent read cannot cache the
+    old row again.
+    """
+    for symbol in symbols:
+        static_cache.delete(symbol)
+        negative_cache.delete(symbol)
+
+def is_unknown_symbol(symbol):
+    """True if the provider recently reported symbol as unknown."""
+    return negative_cache.get(symbol) is not None
+
+UNKNOWN_STATIC = {"name": "Unknown", "sector": "N/A", "asset_type": "N/A"}
+
+def _static_from_asset(asset):
     return {
-        "price":price,
-        "sector": sector,
-        "asset_type": asset_type,
-        "day_change": round(day_change, 2),
-        "day_changeP": round(day_changeP, 2),
-        "update_time": datetime.now(timezone.utc).isoformat()
+        "name": asset.name,
+        "sector": asset.sector,
+        "asset_type": asset.asset_type,
     }
 
-def get_asset_info(symbol):
+def _fetch_info(symbol):
     """
-    Helper function to fetch asset details from yfinance.
-    Returns a dict with name, asset_type, sector, and day_changeP.
-    Calculates day_changeP and assigns random popular sector if N/A.
+    Downloads the provider's info for symbol once and splits it into
+    (static fields, price fields).
+    Assigns a random popular sector if the sector is N/A.
     """
-    ticker = yf.Ticker(symbol)
-    info = ticker.info
+    info = market_data_breaker.call(get_provider().get_info, symbol)
 
-    name = info.get("longName", "Unknown")
-    asset_type = info.get("quoteType", "N/A")
     sector = info.get("sector", "N/A") or info.get("industry", "N/A")
-    current_price = info.get("regularMarketPrice")
-    previous_close = info.get("regularMarketPreviousClose")
-
-    # If sector is N/A, assign a random popular sector
     if sector == "N/A" or sector is None or sector == "":
         sector = random.choice(POPULAR_SECTORS)
 
-    if current_price is not None and previous_close:
-        try:
-            day_changeP = round(((current_price - previous_close) / previous_close) * 100, 2)
-        except ZeroDivisionError:
-            day_changeP = 0.0
+    static = {
+        "name": info.get("longName", "Unknown"),
+        "sector": sector,
+        "asset_type": info.get("quoteType", "N/A"),
+    }
+
+    price = info.get("regularMarketPrice")
+    previous_close = info.get("regularMarketPreviousClose")
+    day_change = info.get("regularMarketChange")
+    day_changeP = info.get("regularMarketChangePercent")
+
+    if day_change is None:
+        day_change = price - previous_close if price is not None and previous_close else 0
+    if day_changeP is None:
+        day_changeP = (day_change / previous_close) * 100 if previous_close else 0
+
+    quote = {
+        "price": price,
+        "day_change": round(day_change, 2),
+        "day_changeP": round(day_changeP, 2),
+        "update_time": datetime.now(timezone.utc).isoformat()
+    }
+
+    return static, quote
+
+def fetch_asset_metadata(symbol):
+    """
+    Single-symbol quote fetch from yfinance.
+    Also stores the symbol's static fields in the static cache.
+    """
+    static, quote = _fetch_info(symbol)
+    if static["name"] == "Unknown":
+        negative_cache[symbol] = True
     else:
-        day_changeP = 0.0
+        static_cache[symbol] = static
+    return quote
+
+def get_asset_info(symbol):
+    """
+    Returns a dict with name, asset_type, sector, price and day_changeP
+    for a symbol, read through the metadata service.
+    """
+    metadata = get_asset_metadata([symbol]).get(symbol)
+    if metadata is None:
+        raise ValueError(f"Could not fetch info for {symbol}")
 
     return {
-        "name": name,
-        "asset_type": asset_type,
-        "sector": sector,
-        "price": current_price,
-        "day_changeP": day_changeP
+        "name": metadata["name"],
+        "asset_type": metadata["asset_type"],
+        "sector": metadata["sector"],
+        "price": metadata.get("price"),
+        "day_changeP": metadata.get("day_changeP", 0.0)
     }
 
-def search_assets(search_term):
+def search_assets(search_term, with_prices=True):
     """
     Search for assets by symbol or name.
     Returns a list of assets matching the search term.
     Includes database search and automatic symbol discovery.
+    With with_prices=False the results carry no price fields and no
+    quotes are looked up; prices can be fetched separately.
     """
     if not search_term or len(search_term) < 1:
         return []
     
     try:
-        # Search in database first
-        search_pattern = f"%{search_term.upper()}%"
-        db_assets = Asset.query.filter(
-            db.or_(
-                Asset.symbol.ilike(search_pattern),
-                Asset.name.ilike(search_pattern)
-            )
-        ).limit(10).all()
-        
-        results = []
-        
-        # Add database results with current prices
-        for asset in db_assets:
-            try:
-                # Get current price from yfinance
-                info = get_asset_info(asset.symbol)
-                results.append({
+        # Search the in-memory index first, or the database until the index is built
+        if search_index.ready:
+            db_assets = search_index.search(search_term, limit=10)
+        else:
+            search_pattern = f"%{search_term.upper()}%"
+            db_assets = [
+                {
                     "id": asset.id,
                     "symbol": asset.symbol,
                     "name": asset.name,
                     "asset_type": asset.asset_type,
                     "sector": asset.sector,
-                    "current_price": info.get("price"),
-                    "day_changeP": info.get("day_changeP")
-                })
-            except Exception:
-                # If yfinance fails, use asset without current price
+                }
+                for asset in Asset.query.filter(
+                    db.or_(
+                        Asset.symbol.ilike(search_pattern),
+                        Asset.name.ilike(search_pattern)
+                    )
+                ).limit(10).all()
+            ]
+        
+        results = []
+
+        if with_prices:
+            # One cache read for all matches, with a single batched fetch for the misses
+            try:
+                prices = fetch_latest_prices([asset["symbol"] for asset in db_assets])
+            except Exception as e:
+                print(f"Error fetching prices for search results: {e}")
+                prices = {}
+
+            for asset in db_assets:
+                quote = prices.get(asset["symbol"], {})
                 results.append({
-                    "id": asset.id,
-                    "symbol": asset.symbol,
-                    "name": asset.name,
-                    "asset_type": asset.asset_type,
-                    "sector": asset.sector,
-                    "current_price": None,
-                    "day_changeP": 0.0
+                    **asset,
+                    "current_price": quote.get("price"),
+                    "day_changeP": quote.get("day_changeP", 0.0)
                 })
+        else:
+            results = list(db_assets)
         
         # If we have fewer than 10 results and search term looks like a symbol,
         # try to find it in yfinance and add to database
@@ -191,16 +642,19 @@ def search_assets(search_term):
                             )
                             db.session.add(new_asset)
                             db.session.commit()
+                            search_index.add(new_asset)
                             
-                            results.insert(0, {
+                            result = {
                                 "id": new_asset.id,
                                 "symbol": new_asset.symbol,
                                 "name": new_asset.name,
                                 "asset_type": new_asset.asset_type,
                                 "sector": new_asset.sector,
-                                "current_price": info.get("price"),
-                                "day_changeP": info.get("day_changeP")
-                            })
+                            }
+                            if with_prices:
+                                result["current_price"] = info.get("price")
+                                result["day_changeP"] = info.get("day_changeP")
+                            results.insert(0, result)
             except Exception:
                 pass  # Ignore errors when trying to add new symbols
         
@@ -1,3 +1,275 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+
 from cachetools import TTLCache
 
-cache = TTLCache(maxsize=100, ttl=900)
\ No newline at end of file
+CACHE_MAXSIZE = 100
+CACHE_TTL = 3600
+CACHE_SOFT_TTL = 900
+
+# Name, sector and asset type rarely change, so they are kept much longer than prices
+STATIC_CACHE_MAXSIZE = 1000
+STATIC_CACHE_TTL = 86400
+
+# Symbols the provider does not know, so repeated lookups skip the network
+NEGATIVE_CACHE_MAXSIZE = 1000
+NEGATIVE_CACHE_TTL = 600
+
+
+class CacheBackend:
+    """
+    Base class for quote cache backends.
+    Subclasses implement _get_entry, _set, _delete, _items and _clear;
+    hit and miss counting is done here.
+
+    Entries are dropped after ttl (the hard TTL). Entries older than
+    soft_ttl are still returned by get_entry but flagged as stale so the
+    caller can serve them and refresh in the background.
+    """
+    name = "base"
+
+    def __init__(self, maxsize=CACHE_MAXSIZE, ttl=CACHE_TTL, soft_ttl=CACHE_SOFT_TTL):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.soft_ttl = min(soft_ttl, ttl)
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self._stats_lock = threading.Lock()
+
+    def get_entry(self, key):
+        """Returns (value, is_stale), or (None, False) on a miss."""
+        entry = self._get_entry(key)
+        if entry is None:
+            with self._stats_lock:
+                self.misses += 1
+            return None, False
+
+        value, stored_at = entry
+        stale = time.time() - stored_at > self.soft_ttl
+        with self._stats_lock:
+            if stale:
+                self.stale_hits += 1
+            else:
+                self.hits += 1
+        return value, stale
+
+    def get(self, key, default=None):
+        value, _ = self.get_entry(key)
+        return default if value is None else value
+
+    def set(self, key, value, stored_at=None):
+        self._set(key, value, stored_at or time.time())
+
+    def update(self, mapping, stored_at=None):
+        stored_at = stored_at or time.time()
+        for key, value in mapping.items():
+            self._set(key, value, stored_at)
+
+    def delete(self, key):
+        self._delete(key)
+
+    def items(self):
+        return self._items()
+
+    def clear(self):
+        self._clear()
+
+    def stats(self):
+        lookups = self.hits + self.stale_hits + self.misses
+        return {
+            "backend": self.name,
+            "pid": os.getpid(),
+            "size": len(self._items()),
+            "maxsize": self.maxsize,
+            "ttl": self.ttl,
+            "soft_ttl": self.soft_ttl,
+            "hits": self.hits,
+            "stale_hits": self.stale_hits,
+            "misses": self.misses,
+            "hit_rate": round((self.hits + self.stale_hits) / lookups, 4) if lookups else 0.0,
+        }
+
+    def __contains__(self, key):
+        return self._get_entry(key) is not None
+
+    def __getitem__(self, key):
+        value = self.get(key)
+        if value is None:
+            raise KeyError(key)
+        return value
+
+    def __setitem__(self, key, value):
+        self.set(key, value)
+
+    def __delitem__(self, key):
+        self._delete(key)
+
+
+class MemoryCache(CacheBackend):
+    """Per-process TTLCache, one copy per worker."""
+    name = "memory"
+
+    def __init__(self, maxsize=CACHE_MAXSIZE, ttl=CACHE_TTL, soft_ttl=CACHE_SOFT_TTL):
+        super().__init__(maxsize, ttl, soft_ttl)
+        self._cache = TTLCache(maxsize=maxsize, ttl=ttl, timer=time.time)
+        self._lock = threading.Lock()
+
+    def _get_entry(self, key):
+        with self._lock:
+            entry = self._cache.get(key)
+        if entry is not None and time.time() - entry[1] > self.ttl:
+            return None
+        return entry
+
+    def _set(self, key, value, stored_at):
+        with self._lock:
+            self._cache[key] = (value, stored_at)
+
+    def _delete(self, key):
+        with self._lock:
+            self._cache.pop(key, None)
+
+    def _items(self):
+        with self._lock:
+            return [(key, value) for key, (value, _) in self._cache.items()]
+
+    def _clear(self):
+        with self._lock:
+            self._cache.clear()
+
+
+class SQLiteCache(CacheBackend):
+    """
+    Cache stored in a SQLite file in WAL mode, shared by every worker
+    process on the host. Values are stored as JSON.
+    """
+    name = "sqlite"
+
+    def __init__(self, path, maxsize=CACHE_MAXSIZE, ttl=CACHE_TTL, soft_ttl=CACHE_SOFT_TTL, table="quote_cache"):
+        super().__init__(maxsize, ttl, soft_ttl)
+        self.path = path
+        self.table = table
+        self._local = threading.local()
+
+        conn = self._connect()
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute(
+            f"CREATE TABLE IF NOT EXISTS {self.table} ("
+            "key TEXT PRIMARY KEY, value TEXT NOT NULL, stored_at REAL NOT NULL)"
+        )
+        conn.execute(f"CREATE INDEX IF NOT EXISTS ix_{self.table}_stored_at ON {self.table} (stored_at)")
+
+    def _connect(self):
+        # One connection per thread, reopened after a fork
+        conn = getattr(self._local, "conn", None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def _get_entry(self, key):
+        row = self._connect().execute(
+            f"SELECT value, stored_at FROM {self.table} WHERE key = ? AND stored_at > ?",
+            (key, time.time() - self.ttl),
+        ).fetchone()
+        return (json.loads(row[0]), row[1]) if row else None
+
+    def _set(self, key, value, stored_at):
+        self._write([(key, json.dumps(value), stored_at)])
+
+    def update(self, mapping, stored_at=None):
+        stored_at = stored_at or time.time()
+        self._write([(key, json.dumps(value), stored_at) for key, value in mapping.items()])
+
+    def _write(self, rows):
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.executemany(
+                f"INSERT OR REPLACE INTO {self.table} (key, value, stored_at) VALUES (?, ?, ?)",
+                rows,
+            )
+            # Drop expired rows, then the oldest ones beyond maxsize
+            conn.execute(f"DELETE FROM {self.table} WHERE stored_at <= ?", (time.time() - self.ttl,))
+            conn.execute(
+                f"DELETE FROM {self.table} WHERE key IN ("
+                f"SELECT key FROM {self.table} ORDER BY stored_at DESC LIMIT -1 OFFSET ?)",
+                (self.maxsize,),
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    def _delete(self, key):
+        self._connect().execute(f"DELETE FROM {self.table} WHERE key = ?", (key,))
+
+    def _items(self):
+        rows = self._connect().execute(
+            f"SELECT key, value FROM {self.table} WHERE stored_at > ?",
+            (time.time() - self.ttl,),
+        ).fetchall()
+        return [(key, json.loads(value)) for key, value in rows]
+
+    def _clear(self):
+        self._connect().execute(f"DELETE FROM {self.table}")
+
+
+class Cache:
+    """
+    Module-level handle to the active backend, so that
+    `from app.services.cache import cache` keeps working after
+    configure_cache swaps the backend at startup.
+    """
+
+    def __init__(self, backend):
+        self.backend = backend
+
+    def __getattr__(self, name):
+        return getattr(self.backend, name)
+
+    def __contains__(self, key):
+        return key in self.backend
+
+    def __getitem__(self, key):
+        return self.backend[key]
+
+    def __setitem__(self, key, value):
+        self.backend[key] = value
+
+    def __delitem__(self, key):
+        del self.backend[key]
+
+
+def create_backend(backend, path=None, maxsize=CACHE_MAXSIZE, ttl=CACHE_TTL, soft_ttl=CACHE_SOFT_TTL, table="quote_cache"):
+    if backend == "memory":
+        return MemoryCache(maxsize=maxsize, ttl=ttl, soft_ttl=soft_ttl)
+    if backend == "sqlite":
+        return SQLiteCache(path, maxsize=maxsize, ttl=ttl, soft_ttl=soft_ttl, table=table)
+    raise ValueError(f"Unknown cache backend: {backend}")
+
+
+def configure_cache(backend, path=None, maxsize=CACHE_MAXSIZE, ttl=CACHE_TTL, soft_ttl=CACHE_SOFT_TTL,
+                    static_maxsize=STATIC_CACHE_MAXSIZE, static_ttl=STATIC_CACHE_TTL,
+                    negative_maxsize=NEGATIVE_CACHE_MAXSIZE, negative_ttl=NEGATIVE_CACHE_TTL):
+    """Replaces the backends behind the module-level quote, static metadata and negative caches."""
+    cache.backend = create_backend(backend, path=path, maxsize=maxsize, ttl=ttl, soft_ttl=soft_ttl)
+    static_cache.backend = create_backend(
+        backend, path=path, maxsize=static_maxsize, ttl=static_ttl, soft_ttl=static_ttl, table="static_cache"
+    )
+    negative_cache.backend = create_backend(
+        backend, path=path, maxsize=negative_maxsize, ttl=negative_ttl, soft_ttl=negative_ttl, table="negative_cache"
+    )
+    print(f"Quote cache backend: {backend}")
+    return cache
+
+
+cache = Cache(MemoryCache())
+static_cache = Cache(MemoryCache(maxsize=STATIC_CACHE_MAXSIZE, ttl=STATIC_CACHE_TTL, soft_ttl=STATIC_CACHE_TTL))
+negative_cache = Cache(MemoryCache(maxsize=NEGATIVE_CACHE_MAXSIZE, ttl=NEGATIVE_CACHE_TTL, soft_ttl=NEGATIVE_CACHE_TTL))
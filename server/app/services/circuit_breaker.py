@@ -0,0 +1,135 @@
+import threading
+import time
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling the provider while the breaker is open."""
+
+
+class CircuitBreaker:
+    """
+    Stops calling a failing dependency for a while.
+
+    closed:    calls go through; failure_threshold consecutive failures or
+               calls slower than slow_call_threshold seconds open the breaker.
+    open:      calls fail fast with CircuitOpenError for reset_timeout seconds.
+    half_open: one probe call is let through; success closes the breaker,
+               failure opens it again.
+    """
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, name, failure_threshold=5, slow_call_threshold=5.0, reset_timeout=30.0):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.slow_call_threshold = slow_call_threshold
+        self.reset_timeout = reset_timeout
+
+        self.state = self.CLOSED
+        self.consecutive_failures = 0
+        self.opened_at = None
+        self.trips = 0
+        self.calls = 0
+        self.failures = 0
+        self.slow_calls = 0
+        self.rejected = 0
+        self._probe_running = False
+        self._lock = threading.Lock()
+
+    def configure(self, failure_threshold=None, slow_call_threshold=None, reset_timeout=None):
+        if failure_threshold is not None:
+            self.failure_threshold = failure_threshold
+        if slow_call_threshold is not None:
+            self.slow_call_threshold = slow_call_threshold
+        if reset_timeout is not None:
+            self.reset_timeout = reset_timeout
+
+    def call(self, func, *args, **kwargs):
+        """Runs func through the breaker, raising CircuitOpenError if it is open."""
+        probe = self._before_call()
+
+        started = time.monotonic()
+        try:
+            result = func(*args, **kwargs)
+        except Exception:
+            self._record(success=False, slow=False, probe=probe)
+            raise
+
+        slow = time.monotonic() - started > self.slow_call_threshold
+        self._record(success=not slow, slow=slow, probe=probe)
+        return result
+
+    def is_open(self):
+        """True while calls are being rejected without a probe."""
+        with self._lock:
+            if self.state == self.OPEN:
+                return time.monotonic() - self.opened_at < self.reset_timeout
+            return self.state == self.HALF_OPEN and self._probe_running
+
+    def status(self):
+        with self._lock:
+            return {
+                "name": self.name,
+                "state": self.state,
+                "consecutive_failures": self.consecutive_failures,
+                "failure_threshold": self.failure_threshold,
+                "slow_call_threshold": self.slow_call_threshold,
+                "reset_timeout": self.reset_timeout,
+                "seconds_until_probe": (
+                    round(max(self.reset_timeout - (time.monotonic() - self.opened_at), 0), 1)
+                    if self.state == self.OPEN else None
+                ),
+                "trips": self.trips,
+                "calls": self.calls,
+                "failures": self.failures,
+                "slow_calls": self.slow_calls,
+                "rejected": self.rejected,
+            }
+
+    def _before_call(self):
+        with self._lock:
+            if self.state == self.OPEN:
+                if time.monotonic() - self.opened_at < self.reset_timeout:
+                    self.rejected += 1
+                    raise CircuitOpenError(f"{self.name} circuit is open")
+                self.state = self.HALF_OPEN
+
+            if self.state == self.HALF_OPEN:
+                if self._probe_running:
+                    self.rejected += 1
+                    raise CircuitOpenError(f"{self.name} circuit is half open, probe in progress")
+                self._probe_running = True
+                return True
+
+            return False
+
+    def _record(self, success, slow, probe):
+        with self._lock:
+            self.calls += 1
+            if probe:
+                self._probe_running = False
+
+            if success:
+                self.consecutive_failures = 0
+                if self.state != self.CLOSED:
+                    print(f"{self.name} circuit closed")
+                self.state = self.CLOSED
+                return
+
+            if slow:
+                self.slow_calls += 1
+            else:
+                self.failures += 1
+            self.consecutive_failures += 1
+
+            if probe or self.consecutive_failures >= self.failure_threshold:
+                if self.state != self.OPEN:
+                    self.trips += 1
+                    print(f"{self.name} circuit opened after {self.consecutive_failures} failed or slow calls")
+                self.state = self.OPEN
+                self.opened_at = time.monotonic()
+
+
+# Shared by every call to the market data provider
+market_data_breaker = CircuitBreaker("market_data")
@@ -0,0 +1,134 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, timedelta
+
+from flask import current_app
+from sqlalchemy.orm import joinedload
+
+from app import db
+from app.models.asset import Asset
+from app.models.holding import Holding
+from app.models.portfolio import Portfolio
+from app.models.portfolio_history import PortfolioHistory
+from app.models.transaction import Transaction
+from app.models.watchlist import Watchlist
+from app.services.insights_service import fetch_latest_news_combined
+from app.services.movers_service import get_market_movers
+from app.services.position_service import format_holdings
+from app.services.valuation_service import value_portfolio
+from app.services.watchlist_service import format_watchlist
+
+# Defaults for how much of the history and transaction log the dashboard shows
+DASHBOARD_HISTORY_DAYS = 365
+DASHBOARD_TRANSACTION_LIMIT = 10
+
+# Seconds the dashboard waits for news and movers before returning without them
+DASHBOARD_SIDE_TIMEOUT = 5.0
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def _get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="dashboard")
+        return _executor
+
+
+def build_dashboard(portfolio_id, history_days=DASHBOARD_HISTORY_DAYS, transaction_limit=DASHBOARD_TRANSACTION_LIMIT):
+    """
+    Builds everything the Dashboard page shows in one call: portfolio
+    with value and return, holdings, recent history and transactions,
+    watchlist, market movers and news.
+
+    News and movers do not depend on the portfolio, so they run on a
+    thread pool while the portfolio part is loaded. Holdings and the
+    watchlist are priced with one quote batch over both symbol sets.
+    Returns None if the portfolio does not exist.
+    """
+    portfolio = db.session.get(Portfolio, portfolio_id)
+    if portfolio is None:
+        return None
+
+    app = current_app._get_current_object()
+    executor = _get_executor()
+    news_future = executor.submit(fetch_latest_news_combined)
+    movers_future = executor.submit(_in_app_context, app, get_market_movers)
+
+    watchlist_items = (
+        Watchlist.query.options(joinedload(Watchlist.asset)).filter_by(portfolio_id=portfolio_id).all()
+    )
+    watched_symbols = [item.asset.symbol for item in watchlist_items if item.asset]
+
+    # The valuation prices the watched symbols in the same quote batch as the positions it loads
+    quotes = {}
+    valuation = value_portfolio(portfolio_id, quotes=quotes, extra_symbols=watched_symbols)
+    summary = {key: value for key, value in valuation.items() if key != "positions"}
+
+    portfolio_data = portfolio.serialize()
+    portfolio_data['value'] = valuation['value']
+    portfolio_data['return'] = valuation['return']
+
+    dashboard = {
+        "portfolio": portfolio_data,
+        "valuation": summary,
+        "holdings": format_holdings(valuation["positions"]),
+        "history": _recent_history(portfolio_id, history_days),
+        "transactions": _recent_transactions(portfolio_id, transaction_limit),
+        "watchlist": format_watchlist(watchlist_items, quotes),
+        "errors": {},
+    }
+
+    for key, future in (("market_movers", movers_future), ("news", news_future)):
+        try:
+            dashboard[key] = future.result(timeout=DASHBOARD_SIDE_TIMEOUT)
+        except Exception as e:
+            print(f"Dashboard {key} unavailable: {e}")
+            dashboard[key] = []
+            dashboard["errors"][key] = str(e) or type(e).__name__
+
+    return dashboard
+
+
+def _in_app_context(app, func):
+    with app.app_context():
+        return func()
+
+
+def _recent_history(portfolio_id, days):
+    start = date.today() - timedelta(days=days)
+    history = (
+        PortfolioHistory.query
+        .filter(PortfolioHistory.portfolio_id == portfolio_id, PortfolioHistory.date >= start)
+        .order_by(PortfolioHistory.date)
+        .all()
+    )
+    return [h.serialize() for h in history]
+
+
+def _recent_transactions(portfolio_id, limit):
+    # Joins the asset symbol in instead of Transaction.serialize looking it up per row
+    rows = (
+        db.session.query(Transaction, Asset.symbol)
+        .outerjoin(Holding, Transaction.holding_id == Holding.id)
+        .outerjoin(Asset, Holding.asset_id == Asset.id)
+        .filter(Transaction.portfolio_id == portfolio_id)
+        .order_by(Transaction.created_at.desc())
+        .limit(limit)
+        .all()
+    )
+    return [
+        {
+            'id': t.id,
+            'portfolio_id': t.portfolio_id,
+            'holding_id': t.holding_id,
+            'quantity': t.quantity,
+            'price': t.price,
+            'created_at': t.created_at.isoformat(),
+            'transaction_type': t.transaction_type,
+            'asset_symbol': symbol,
+        }
+        for t, symbol in rows
+    ]
@@ -0,0 +1,136 @@
+import atexit
+import threading
+import time
+
+from sqlalchemy import and_, bindparam, insert, or_, select, update
+
+from app import db
+from app.models.asset_history import AssetHistory
+from app.services.price_store import sync_price_rows
+
+# Seconds between background flushes of buffered prices
+HISTORY_FLUSH_INTERVAL = 30
+
+
+class AssetHistoryBuffer:
+    """
+    Write-behind buffer for intraday asset_history prices.
+    record() keeps only the latest price per (asset_id, date) in memory;
+    flush() writes everything buffered as one bulk upsert on its own
+    connection, so the trade path never waits on these writes.
+    """
+
+    def __init__(self):
+        self._pending = {}
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self.flushed_rows = 0
+        self.last_flush = None
+        self.last_error = None
+
+    def record(self, asset_id, price, day):
+        if price is None:
+            return
+        with self._lock:
+            self._pending[(asset_id, day)] = price
+
+    def pending(self):
+        with self._lock:
+            return len(self._pending)
+
+    def flush(self):
+        """Writes the buffered prices. Needs an app context. Returns the number of rows written."""
+        with self._flush_lock:
+            with self._lock:
+                batch, self._pending = self._pending, {}
+            if not batch:
+                return 0
+
+            try:
+                _upsert(batch)
+            except Exception as e:
+                # Put the batch back without overwriting prices recorded since
+                with self._lock:
+                    for key, price in batch.items():
+                        self._pending.setdefault(key, price)
+                self.last_error = str(e)
+                print(f"Error flushing asset history buffer: {e}")
+                raise
+
+            try:
+                sync_price_rows(
+                    {"asset_id": asset_id, "date": day, "price": price} for (asset_id, day), price in batch.items()
+                )
+            except Exception as e:
+                print(f"Error syncing flushed prices to the price store: {e}")
+
+            self.flushed_rows += len(batch)
+            self.last_flush = time.time()
+            self.last_error = None
+            return len(batch)
+
+    def stats(self):
+        return {
+            "pending": self.pending(),
+            "flushed_rows": self.flushed_rows,
+            "last_flush": self.last_flush,
+            "last_error": self.last_error,
+        }
+
+
+def _upsert(batch):
+    # asset_history has no unique key on (asset_id, date), so look up which rows exist first,
+    # then run one executemany UPDATE and one bulk INSERT in the same transaction
+    table = AssetHistory.__table__
+    keys = list(batch)
+    with db.engine.begin() as conn:
+        existing = {
+            (row.asset_id, row.date)
+            for row in conn.execute(
+                select(table.c.asset_id, table.c.date).where(
+                    or_(*(and_(table.c.asset_id == asset_id, table.c.date == day) for asset_id, day in keys))
+                )
+            )
+        }
+
+        updates = [
+            {"b_asset_id": asset_id, "b_date": day, "price": batch[(asset_id, day)]}
+            for asset_id, day in keys if (asset_id, day) in existing
+        ]
+        inserts = [
+            {"asset_id": asset_id, "date": day, "price": batch[(asset_id, day)]}
+            for asset_id, day in keys if (asset_id, day) not in existing
+        ]
+
+        if updates:
+            conn.execute(
+                update(table)
+                .where(table.c.asset_id == bindparam("b_asset_id"), table.c.date == bindparam("b_date"))
+                .values(price=bindparam("price")),
+                updates,
+            )
+        if inserts:
+            conn.execute(insert(table), inserts)
+
+
+history_buffer = AssetHistoryBuffer()
+
+
+def flush_history_buffer():
+    """Flushes the module-level buffer. Needs an app context."""
+    return history_buffer.flush()
+
+
+def init_history_buffer(app):
+    """Flushes whatever is still buffered when the process exits."""
+    def flush_on_exit():
+        if not history_buffer.pending():
+            return
+        try:
+            with app.app_context():
+                written = history_buffer.flush()
+            print(f"Flushed {written} buffered asset history rows on exit")
+        except Exception:
+            pass
+
+    atexit.register(flush_on_exit)
@@ -5,81 +5,101 @@ from app.models.transaction import Transaction
 
 from datetime import datetime, timezone
 
-from app.services.asset_service import fetch_latest_price
+from app.services.position_service import apply_buy, apply_sell
 
 def update_portfolio_balance(portfolio, pnl):
     """
     Updates the portfolio's balance by adding the PnL.
+    The caller commits, together with the rest of the trade.
     """
     print(f"Updating balance: Current={portfolio.balance}, PnL={pnl}")
     portfolio.balance += pnl
-    db.session.commit()
     print(f"New balance: {portfolio.balance}")
 
-def buy_asset(portfolio_id, asset_id, quantity, latest_price):
+def _lock_portfolio(portfolio_id):
     """
-    Buys a certain quantity of an asset, creating a new holding in the process.
+    Loads the portfolio with SELECT ... FOR UPDATE, so concurrent trades on
+    it wait until this one commits. The portfolio is always locked before
+    its lots, which keeps the lock order the same for every trade.
     """
-    portfolio = Portfolio.query.get(portfolio_id)
+    portfolio = (
+        Portfolio.query
+        .filter_by(id=portfolio_id)
+        .populate_existing()
+        .with_for_update()
+        .first()
+    )
     if not portfolio:
         raise ValueError("Portfolio not found.")
+    return portfolio
 
+def _buy_lot(portfolio, asset_id, quantity, latest_price):
+    """
+    Adds a new holding for a buy, with its position and balance changes,
+    to the session. Returns the holding; its transaction needs the id
+    assigned at the next flush.
+    """
     cost = quantity * latest_price
     if portfolio.balance < cost:
         raise ValueError("Insufficient balance in portfolio.")
-    
+
     holding = Holding(
-        portfolio_id=portfolio_id,
+        portfolio_id=portfolio.id,
         asset_id=asset_id,
         quantity=quantity,
         purchase_price=latest_price
     )
     db.session.add(holding)
-    db.session.commit()
-
+    apply_buy(portfolio.id, asset_id, quantity, latest_price)
     update_portfolio_balance(portfolio, -cost)
+    return holding
 
+def _buy_transaction(holding):
     transaction = Transaction(
-        portfolio_id=portfolio_id,
+        portfolio_id=holding.portfolio_id,
         holding_id=holding.id,
-        quantity=quantity,
-        price=latest_price,
+        quantity=holding.quantity,
+        price=holding.purchase_price,
         created_at=datetime.now(timezone.utc),
         transaction_type='buy'
     )
-
     db.session.add(transaction)
-    db.session.commit()
-
     return transaction
 
-def sell_asset(portfolio_id, asset_id, quantity, latest_price):
+def _sell_lots(portfolio, asset_id, quantity, latest_price):
     """
-    Sells a certain quantity of an asset across possibly multiple holdings.
+    Sells quantity of an asset from its lots in FIFO order, locking the
+    lots first. Adds the lot, position and balance changes and one
+    transaction per lot to the session. Returns the transactions.
     """
-    holdings = Holding.query.filter_by(portfolio_id=portfolio_id, asset_id=asset_id).filter(Holding.quantity > 0).order_by(Holding.purchase_date.asc()).all()
+    holdings = (
+        Holding.query
+        .filter_by(portfolio_id=portfolio.id, asset_id=asset_id)
+        .filter(Holding.quantity > 0)
+        .order_by(Holding.purchase_date.asc())
+        .populate_existing()
+        .with_for_update()
+        .all()
+    )
 
     # compute total available quantity
     total_quantity = 0
     for h in holdings:
         total_quantity += h.quantity
-    
+
     if quantity > total_quantity:
         raise ValueError("Cannot sell more than total holding quantity.")
 
-    portfolio = Portfolio.query.get(portfolio_id)   
-    if not portfolio:
-        raise ValueError("Portfolio not found.") 
-
     # sell from holdings in FIFO order
     remaining_to_sell = quantity
     total_sale_proceeds = 0.0
+    total_cost_sold = 0.0
     transactions = []
 
     for h in holdings:
         if remaining_to_sell <= 0:
             break
-        
+
         # compute sale proceeds for the quantity sold from this holding
         sell_quantity = min(h.quantity, remaining_to_sell)
         sale_proceeds = sell_quantity * latest_price
@@ -87,77 +107,111 @@ def sell_asset(portfolio_id, asset_id, quantity, latest_price):
 
         # update holding quantity
         h.quantity -= sell_quantity
+        total_cost_sold += sell_quantity * h.purchase_price
 
         # create transaction record for this holding sale
         transaction = Transaction(
-            portfolio_id=portfolio_id,
+            portfolio_id=portfolio.id,
             holding_id=h.id,
             quantity=sell_quantity,
             price=latest_price,
             created_at=datetime.now(timezone.utc),
             transaction_type='sell'
         )
-        db.session.add(transaction)
-        db.session.commit()
-
         transactions.append(transaction)
         remaining_to_sell -= sell_quantity
 
+    db.session.add_all(transactions)
+
+    # Update the position once, at the average purchase price of the lots sold
+    if quantity > 0:
+        apply_sell(portfolio.id, asset_id, quantity, latest_price, total_cost_sold / quantity)
+
     # Add total sale proceeds to portfolio balance
-    portfolio.balance += total_sale_proceeds
-    db.session.commit()
-    
+    update_portfolio_balance(portfolio, total_sale_proceeds)
     print(f"Total sale proceeds added to portfolio: {total_sale_proceeds}")
-    print(f"Portfolio new balance: {portfolio.balance}")
-    
+
     return transactions
 
-def get_asset_return(portfolio_id, asset_id):
+def buy_asset(portfolio_id, asset_id, quantity, latest_price):
     """
-    asset_return = (current_value - total_cost) / total_cost
+    Buys a certain quantity of an asset, creating a new holding in the process.
+    The holding, position, balance and transaction are written in one commit.
     """
-    holdings = Holding.query.filter_by(portfolio_id=portfolio_id, asset_id=asset_id).filter(Holding.quantity > 0).all()
+    try:
+        portfolio = _lock_portfolio(portfolio_id)
+        holding = _buy_lot(portfolio, asset_id, quantity, latest_price)
 
-    total_quantity = 0
-    total_cost = 0.0
-    for h in holdings:
-        total_quantity += h.quantity
-        total_cost += h.quantity * h.purchase_price
-    
-    if total_cost == 0:
-        return 0.0
+        # Assigns holding.id for the transaction without committing
+        db.session.flush()
 
-    current_value = total_quantity * fetch_latest_price(asset_id)
+        transaction = _buy_transaction(holding)
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
 
-    return (current_value - total_cost) / total_cost
+    return transaction
 
-def get_portfolio_value(portfolio_id):
+def sell_asset(portfolio_id, asset_id, quantity, latest_price):
     """
-    AUM = sum of (quantity of each holding × current price of each asset) + realized gains
+    Sells a certain quantity of an asset across possibly multiple holdings.
+    Every lot, the position, the balance and the transactions are written in one commit.
     """
-    holdings = Holding.query.filter_by(portfolio_id=portfolio_id).filter(Holding.quantity > 0).all()
-
-    aum = 0.0
+    try:
+        portfolio = _lock_portfolio(portfolio_id)
+        transactions = _sell_lots(portfolio, asset_id, quantity, latest_price)
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
 
-    for h in holdings:
-        aum += h.quantity * fetch_latest_price(h.asset_id)
-    
-    return aum + Portfolio.query.get(portfolio_id).balance - Portfolio.query.get(portfolio_id)._INIT_BALANCE
+    return transactions
 
-def get_portfolio_return(portfolio_id):
+def execute_trades(trades):
     """
-    portfolio_return = (current_value - total_invested) / total_invested
+    Executes a list of priced trades, dicts with portfolio_id, asset_id,
+    quantity, transaction_type and price, in order and in one commit.
+    Every portfolio involved is locked up front in id order. Each buy is
+    flushed and gets its transaction as soon as its lot is added, so a
+    later sell from that lot in the same batch cannot change the recorded
+    quantity, and transactions are written in execution order.
+
+    Returns a list with the transactions of each trade. If any trade
+    fails nothing is written and a ValueError naming the trade index is
+    raised.
     """
-    portfolio = Portfolio.query.get(portfolio_id)
+    try:
+        portfolio_ids = sorted({trade['portfolio_id'] for trade in trades})
+        portfolios = {
+            portfolio.id: portfolio
+            for portfolio in Portfolio.query
+            .filter(Portfolio.id.in_(portfolio_ids))
+            .order_by(Portfolio.id)
+            .populate_existing()
+            .with_for_update()
+        }
+
+        results = []
+        for index, trade in enumerate(trades):
+            try:
+                portfolio = portfolios.get(trade['portfolio_id'])
+                if portfolio is None:
+                    raise ValueError("Portfolio not found.")
+
+                if trade['transaction_type'] == 'sell':
+                    results.append(_sell_lots(portfolio, trade['asset_id'], trade['quantity'], trade['price']))
+                else:
+                    holding = _buy_lot(portfolio, trade['asset_id'], trade['quantity'], trade['price'])
+                    # Assigns holding.id for the transaction without committing
+                    db.session.flush()
+                    results.append([_buy_transaction(holding)])
+            except ValueError as e:
+                raise ValueError(f"Trade {index}: {e}") from e
 
-    total_invested = 0.0
-    for t in portfolio.transactions:
-        if t.transaction_type == 'buy':
-            total_invested += t.quantity * t.price
-    
-    if total_invested == 0:
-        return 0.0
-
-    current_value = get_portfolio_value(portfolio_id)
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
 
-    return (current_value - total_invested) / total_invested
+    return results
@@ -0,0 +1,332 @@
+import json
+import os
+import random
+import threading
+import time
+from datetime import date, datetime, timezone
+
+import pandas as pd
+import yfinance as yf
+
+# Seconds yf.download waits on the network before giving up
+DOWNLOAD_TIMEOUT = 10
+
+
+class EmptyResponseError(Exception):
+    """
+    Raised when a provider returns no data at all for a non-empty request.
+    yf.download reports network errors this way instead of raising, so
+    the circuit breaker needs it to count them as failures.
+    """
+
+
+class MarketDataProvider:
+    """
+    Source of quotes, metadata and daily closing prices.
+
+    get_quotes returns {symbol: {"price", "day_change", "day_changeP",
+    "volume", "update_time"}}, leaving out symbols it has no data for.
+    get_info returns the raw metadata dict for a symbol ({} if unknown).
+    get_history returns a pandas Series of closes indexed by datetime.date.
+    """
+    name = "base"
+
+    def get_quotes(self, symbols):
+        raise NotImplementedError
+
+    def get_info(self, symbol):
+        raise NotImplementedError
+
+    def get_history(self, symbol, start=None, end=None, period=None):
+        raise NotImplementedError
+
+    def get_histories(self, symbols, start=None, end=None, period=None):
+        """Returns {symbol: closes} for many symbols; providers may override with a bulk call."""
+        histories = {}
+        for symbol in symbols:
+            closes = self.get_history(symbol, start=start, end=end, period=period)
+            if not closes.empty:
+                histories[symbol] = closes
+        return histories
+
+
+class YFinanceProvider(MarketDataProvider):
+    name = "yfinance"
+
+    def __init__(self, timeout=DOWNLOAD_TIMEOUT):
+        self.timeout = timeout
+
+    def get_quotes(self, symbols):
+        data = yf.download(
+            list(symbols),
+            period="5d",
+            interval="1d",
+            group_by="ticker",
+            auto_adjust=False,
+            progress=False,
+            timeout=self.timeout,
+        )
+
+        quotes = {}
+        for symbol in symbols:
+            quote = _quote_from_bars(_bars_for_symbol(data, symbol))
+            if quote is not None:
+                quotes[symbol] = quote
+        if symbols and not quotes:
+            raise EmptyResponseError(f"No quotes returned for {len(symbols)} symbols")
+        return quotes
+
+    def get_info(self, symbol):
+        return yf.Ticker(symbol).info
+
+    def get_history(self, symbol, start=None, end=None, period=None):
+        if period:
+            hist = yf.Ticker(symbol).history(period=period)
+        else:
+            hist = yf.Ticker(symbol).history(start=start, end=end)
+        return _closes(hist)
+
+    def get_histories(self, symbols, start=None, end=None, period=None):
+        if not symbols:
+            return {}
+        data = yf.download(
+            list(symbols),
+            start=start,
+            end=end,
+            period=period,
+            interval="1d",
+            group_by="ticker",
+            auto_adjust=False,
+            progress=False,
+            timeout=self.timeout,
+        )
+
+        histories = {}
+        for symbol in symbols:
+            closes = _closes(_bars_for_symbol(data, symbol))
+            if not closes.empty:
+                histories[symbol] = closes
+        if not histories:
+            raise EmptyResponseError(f"No history returned for {len(symbols)} symbols")
+        return histories
+
+
+class RecordingProvider(MarketDataProvider):
+    """
+    Wraps another provider and saves every response under directory,
+    one JSON file per symbol, so ReplayProvider can serve them later.
+    """
+    name = "record"
+
+    def __init__(self, inner, directory):
+        self.inner = inner
+        self.store = _RecordingStore(directory)
+
+    def get_quotes(self, symbols):
+        quotes = self.inner.get_quotes(symbols)
+        for symbol, quote in quotes.items():
+            self.store.write("quotes", symbol, quote)
+        return quotes
+
+    def get_info(self, symbol):
+        info = self.inner.get_info(symbol)
+        self.store.write("info", symbol, info)
+        return info
+
+    def get_history(self, symbol, start=None, end=None, period=None):
+        closes = self.inner.get_history(symbol, start=start, end=end, period=period)
+        self._record_history(symbol, closes)
+        return closes
+
+    def get_histories(self, symbols, start=None, end=None, period=None):
+        histories = self.inner.get_histories(symbols, start=start, end=end, period=period)
+        for symbol, closes in histories.items():
+            self._record_history(symbol, closes)
+        return histories
+
+    def _record_history(self, symbol, closes):
+        # Merge with earlier recordings so one file covers every range seen so far
+        bars = self.store.read("history", symbol) or {}
+        bars.update({day.isoformat(): float(close) for day, close in closes.items()})
+        self.store.write("history", symbol, bars)
+
+
+class ReplayProvider(MarketDataProvider):
+    """
+    Serves responses saved by RecordingProvider without touching the
+    network. Every call sleeps latency seconds (plus up to jitter
+    seconds) to simulate the round trip.
+    """
+    name = "replay"
+
+    def __init__(self, directory, latency=0.0, jitter=0.0):
+        self.store = _RecordingStore(directory)
+        self.latency = latency
+        self.jitter = jitter
+
+    def get_quotes(self, symbols):
+        self._wait()
+        quotes = {}
+        for symbol in symbols:
+            quote = self.store.read("quotes", symbol)
+            if quote is not None:
+                quotes[symbol] = {**quote, "update_time": datetime.now(timezone.utc).isoformat()}
+        return quotes
+
+    def get_info(self, symbol):
+        self._wait()
+        return self.store.read("info", symbol) or {}
+
+    def get_history(self, symbol, start=None, end=None, period=None):
+        self._wait()
+        return self._read_history(symbol, start, end, period)
+
+    def get_histories(self, symbols, start=None, end=None, period=None):
+        self._wait()
+        histories = {}
+        for symbol in symbols:
+            closes = self._read_history(symbol, start, end, period)
+            if not closes.empty:
+                histories[symbol] = closes
+        return histories
+
+    def _read_history(self, symbol, start, end, period):
+        bars = self.store.read("history", symbol) or {}
+        closes = pd.Series(
+            {date.fromisoformat(day): close for day, close in bars.items()}, dtype="float64"
+        ).sort_index()
+        if closes.empty:
+            return closes
+        if period:
+            rows = _period_rows(period)
+            return closes.iloc[-rows:] if rows else closes
+        if start is not None:
+            closes = closes[closes.index >= _as_date(start)]
+        if end is not None:
+            closes = closes[closes.index < _as_date(end)]
+        return closes
+
+    def _wait(self):
+        delay = self.latency + random.uniform(0, self.jitter)
+        if delay > 0:
+            time.sleep(delay)
+
+
+class _RecordingStore:
+    """JSON files laid out as <directory>/<kind>/<SYMBOL>.json."""
+
+    def __init__(self, directory):
+        self.directory = directory
+        self._lock = threading.Lock()
+
+    def read(self, kind, symbol):
+        path = self._path(kind, symbol)
+        if not os.path.exists(path):
+            return None
+        with open(path) as f:
+            return json.load(f)
+
+    def write(self, kind, symbol, value):
+        path = self._path(kind, symbol)
+        with self._lock:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp_path = f"{path}.{os.getpid()}.tmp"
+            with open(tmp_path, "w") as f:
+                json.dump(value, f, default=str)
+            os.replace(tmp_path, path)
+
+    def _path(self, kind, symbol):
+        return os.path.join(self.directory, kind, f"{symbol.upper().replace('/', '_')}.json")
+
+
+def _bars_for_symbol(data, symbol):
+    """Returns the daily bars for one symbol from a yf.download frame."""
+    if data is None or data.empty:
+        return None
+    if isinstance(data.columns, pd.MultiIndex):
+        if symbol not in data.columns.get_level_values(0):
+            return None
+        return data[symbol]
+    return data
+
+
+def _closes(bars):
+    if bars is None or bars.empty or "Close" not in bars:
+        return pd.Series(dtype="float64")
+    closes = bars["Close"].dropna()
+    closes.index = [timestamp.date() for timestamp in closes.index]
+    return closes.astype("float64")
+
+
+def _quote_from_bars(bars):
+    """
+    Builds a quote dict from daily bars.
+    Returns None when there are no closing prices.
+    """
+    if bars is None or bars.empty:
+        return None
+
+    closes = bars["Close"].dropna()
+    if closes.empty:
+        return None
+
+    price = float(closes.iloc[-1])
+    previous_close = float(closes.iloc[-2]) if len(closes) > 1 else price
+    day_change = price - previous_close
+    day_changeP = (day_change / previous_close) * 100 if previous_close else 0
+
+    volume = None
+    if "Volume" in bars:
+        volumes = bars["Volume"].dropna()
+        if not volumes.empty:
+            volume = int(volumes.iloc[-1])
+
+    return {
+        "price": price,
+        "day_change": round(day_change, 2),
+        "day_changeP": round(day_changeP, 2),
+        "volume": volume,
+        "update_time": datetime.now(timezone.utc).isoformat()
+    }
+
+
+def _as_date(value):
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, str):
+        return date.fromisoformat(value)
+    return value
+
+
+def _period_rows(period):
+    # Rough number of daily bars in a yfinance period string such as "1d", "5d" or "1mo"
+    units = {"d": 1, "wk": 5, "mo": 21, "y": 252}
+    for suffix, rows in units.items():
+        if period.endswith(suffix) and period[:-len(suffix)].isdigit():
+            return int(period[:-len(suffix)]) * rows
+    return None
+
+
+def create_provider(name, directory=None, latency=0.0, jitter=0.0, timeout=DOWNLOAD_TIMEOUT):
+    if name == "yfinance":
+        return YFinanceProvider(timeout=timeout)
+    if name == "record":
+        return RecordingProvider(YFinanceProvider(timeout=timeout), directory)
+    if name == "replay":
+        return ReplayProvider(directory, latency=latency, jitter=jitter)
+    raise ValueError(f"Unknown market data provider: {name}")
+
+
+_provider = YFinanceProvider()
+
+
+def configure_provider(name, directory=None, latency=0.0, jitter=0.0, timeout=DOWNLOAD_TIMEOUT):
+    """Replaces the provider returned by get_provider."""
+    global _provider
+    _provider = create_provider(name, directory=directory, latency=latency, jitter=jitter, timeout=timeout)
+    print(f"Market data provider: {name}")
+    return _provider
+
+
+def get_provider():
+    return _provider
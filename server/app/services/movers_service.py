@@ -0,0 +1,128 @@
+import heapq
+import threading
+import time
+from datetime import datetime, timezone
+
+from flask import current_app
+
+from app.models.asset import Asset
+from app.services.asset_service import fetch_batch_quotes, get_static_metadata
+from app.services.cache import cache
+
+# Symbols ranked on top of every asset in the assets table
+MOVERS_UNIVERSE = [
+    "WK", "ATEC", "TILE", "BIO", "IRTC", "APPF", "RDDT", "AUPH", "RKT", "COOP",
+    "FLR", "NSP", "ENVX", "LUMN", "EMN", "SATS", "INOD", "RIOT", "COIN", "NWL",
+    "NVDA", "AMZN", "VALE", "LCID", "SOFI", "TSLA", "AAPL", "HOOD", "NIO", "AMD"
+]
+
+# Number of entries kept in each ranking
+MOVERS_TOP_K = 10
+
+# Default seconds after which a worker rebuilds its own snapshot on read
+MOVERS_INTERVAL = 300
+
+_snapshot = None
+_snapshot_built_at = None
+_snapshot_lock = threading.Lock()
+_rebuild_lock = threading.Lock()
+
+
+def get_movers_universe(extra=None):
+    """Returns every symbol in the assets table plus the configured universe."""
+    symbols = [symbol for (symbol,) in Asset.query.with_entities(Asset.symbol).all()]
+    return list(dict.fromkeys(symbols + list(extra if extra is not None else MOVERS_UNIVERSE)))
+
+
+def build_movers_snapshot(quotes, names, k=MOVERS_TOP_K):
+    """
+    Ranks quotes into the top k gainers, losers and most active symbols
+    with heap-based selection instead of a full sort.
+    """
+    movers = [
+        {
+            "symbol": symbol,
+            "name": names.get(symbol, symbol),
+            "price": quote.get("price"),
+            "day_changeP": quote.get("day_changeP"),
+            "volume": quote.get("volume"),
+        }
+        for symbol, quote in quotes.items()
+        if quote.get("price") is not None and quote.get("day_changeP") is not None
+    ]
+    with_volume = [mover for mover in movers if mover["volume"] is not None]
+
+    return {
+        "gainers": heapq.nlargest(k, movers, key=lambda mover: mover["day_changeP"]),
+        "losers": heapq.nsmallest(k, movers, key=lambda mover: mover["day_changeP"]),
+        "most_active": heapq.nlargest(k, with_volume, key=lambda mover: mover["volume"]),
+        "universe_size": len(movers),
+        "updated_at": datetime.now(timezone.utc).isoformat(),
+    }
+
+
+def refresh_movers_snapshot(universe=None, k=MOVERS_TOP_K, refresh=True):
+    """
+    Recomputes the movers snapshot over the asset universe. With refresh
+    set every quote is re-downloaded in bulk; otherwise cached quotes are
+    used and only the uncached symbols are downloaded. Needs an app context.
+
+    Downloaded quotes are ranked without being written to the quote
+    cache, so a large universe cannot evict the held and watched quotes
+    kept warm by the quote refresh job.
+    """
+    global _snapshot, _snapshot_built_at
+    symbols = get_movers_universe(universe)
+
+    cached = {symbol: cache.get(symbol) for symbol in symbols}
+    quotes = {symbol: quote for symbol, quote in cached.items() if quote is not None}
+    if refresh:
+        quotes.update(fetch_batch_quotes(symbols))
+    else:
+        quotes.update(fetch_batch_quotes([symbol for symbol in symbols if cached[symbol] is None]))
+
+    static = get_static_metadata(list(quotes), cache_quotes=False)
+    names = {symbol: fields["name"] for symbol, fields in static.items()}
+
+    snapshot = build_movers_snapshot(quotes, names, k=k)
+    with _snapshot_lock:
+        _snapshot = snapshot
+        _snapshot_built_at = time.monotonic()
+    print(f"Market movers snapshot ranked {snapshot['universe_size']} symbols")
+    return snapshot
+
+
+def get_market_movers():
+    """Returns the top 3 gainers followed by the top 2 losers from the latest snapshot."""
+    snapshot = get_movers_snapshot()
+    return snapshot["gainers"][:3] + list(reversed(snapshot["losers"][:2]))
+
+
+def get_movers_snapshot():
+    """
+    Returns the latest movers snapshot. Builds one from cached quotes if
+    this worker has none yet or it is older than MARKET_MOVERS_INTERVAL,
+    for example when its scheduler is disabled, using the same configured
+    universe and k as the scheduled job. While one request rebuilds,
+    others are served the previous snapshot.
+    """
+    interval = current_app.config.get("MARKET_MOVERS_INTERVAL", MOVERS_INTERVAL)
+    with _snapshot_lock:
+        snapshot = _snapshot
+        fresh = snapshot is not None and time.monotonic() - _snapshot_built_at < interval
+    if fresh:
+        return snapshot
+
+    if not _rebuild_lock.acquire(blocking=snapshot is None):
+        return snapshot
+    try:
+        with _snapshot_lock:
+            if _snapshot is not None and time.monotonic() - _snapshot_built_at < interval:
+                return _snapshot
+        return refresh_movers_snapshot(
+            universe=current_app.config.get("MARKET_MOVERS_UNIVERSE"),
+            k=current_app.config.get("MARKET_MOVERS_TOP_K", MOVERS_TOP_K),
+            refresh=False,
+        )
+    finally:
+        _rebuild_lock.release()
@@ -3,41 +3,298 @@ from app.models.holding import Holding
 from app.models.asset import Asset
 from app.models.asset_history import AssetHistory
 from app.models.portfolio_history import PortfolioHistory
+from app.models.transaction import Transaction
 from app import db
+from app.services.circuit_breaker import CircuitOpenError, market_data_breaker
+from app.services.market_data import EmptyResponseError, get_provider
+from app.services.price_store import price_store, sync_price_rows
 
 from datetime import datetime, timezone
-
-import yfinance as yf
 from datetime import timedelta
 
-def backfill_portfolio_history(portfolio_id):
-    portfolio = Portfolio.query.get(portfolio_id)
+import pandas as pd
+from sqlalchemy import func, insert
+
+def backfill_portfolio_history(portfolio_id, start=None):
+    """
+    Fills in daily portfolio_history (and the asset_history it is built from)
+    from start, default the portfolio's creation date or its first
+    transaction if earlier, up to yesterday. Today is left to the daily
+    snapshot once it is over, as an intraday row would never be revised.
+
+    Every symbol's closes for the whole range come from one bulk download.
+    Quantities in effect on each date are derived from the buy and sell
+    transactions, and value = sum of quantity × close, with closes carried
+    forward over days a symbol did not trade. Only rows missing from
+    asset_history and portfolio_history are inserted, in bulk.
+
+    Returns counts of inserted rows, or None if the portfolio does not exist.
+    """
+    portfolio = db.session.get(Portfolio, portfolio_id)
     if not portfolio:
         return None
 
-    current = portfolio.creation_date
-    while current <= datetime.now(timezone.utc).date():
-        value = 0.0
-        for holding in portfolio.holdings:
-            if holding.purchase_date.date() > current:
-                continue
-
-            asset = Asset.query.get(holding.asset_id)
-            ticker = yf.Ticker(asset.symbol.upper())
-            hist = ticker.history(start=current, end=current + timedelta(days=1))
-            close = hist['Close'].iloc[0] if not hist.empty else None
-
-            if close:
-                value += holding.quantity * close
-                existing_history = AssetHistory.query.filter_by(asset_id=asset.id, date=current).first()
-                if not existing_history:
-                    db.session.add(AssetHistory(asset_id=asset.id, price=close, date=current))
-            
-        if value != 0.0:
-            balance = round(value * 0.10, 2)  # 10% as cash balance
-            existing = PortfolioHistory.query.filter_by(date=current, portfolio_id=portfolio_id).first()
-            if not existing:
-                db.session.add(PortfolioHistory(date=current, value=value, balance=balance, portfolio_id=portfolio_id))
-        current += timedelta(days=1)
-
-    db.session.commit()
\ No newline at end of file
+    deltas = _quantity_deltas(portfolio_id)
+    if deltas.empty:
+        return {"asset_history": 0, "portfolio_history": 0}
+
+    if start is None:
+        start = min(portfolio.creation_date, deltas.index.min())
+    # Exclusive, so the download stops at yesterday's close
+    end = datetime.now(timezone.utc).date()
+    if start >= end:
+        return {"asset_history": 0, "portfolio_history": 0}
+
+    assets = {asset.symbol.upper(): asset.id for asset in Asset.query.filter(Asset.id.in_(list(deltas.columns)))}
+    try:
+        histories = market_data_breaker.call(get_provider().get_histories, list(assets), start=start, end=end)
+    except (CircuitOpenError, EmptyResponseError) as e:
+        print(f"Stopping backfill for portfolio {portfolio_id}: {e}")
+        return {"asset_history": 0, "portfolio_history": 0}
+    if not histories:
+        return {"asset_history": 0, "portfolio_history": 0}
+
+    # Closes aligned on the union of trading days, one column per asset id
+    closes = pd.DataFrame({assets[symbol]: series for symbol, series in histories.items()}).sort_index()
+    closes = closes[closes.index >= start]
+    if closes.empty:
+        return {"asset_history": 0, "portfolio_history": 0}
+
+    # Running quantity per asset, sampled on each trading day
+    calendar = deltas.index.union(closes.index)
+    quantities = deltas.reindex(calendar, fill_value=0.0).cumsum().reindex(closes.index)
+    quantities = quantities.reindex(columns=closes.columns, fill_value=0.0)
+
+    values = (quantities * closes.ffill()).sum(axis=1, skipna=True)
+
+    asset_rows = _missing_asset_history(closes)
+    portfolio_rows = _missing_portfolio_history(portfolio_id, values)
+
+    if asset_rows:
+        db.session.execute(insert(AssetHistory), asset_rows)
+    if portfolio_rows:
+        _insert_portfolio_history(portfolio_rows)
+    db.session.commit()
+    sync_price_rows(asset_rows)
+
+    print(f"Backfilled portfolio {portfolio_id}: {len(asset_rows)} asset and {len(portfolio_rows)} portfolio history rows")
+    return {"asset_history": len(asset_rows), "portfolio_history": len(portfolio_rows)}
+
+def _quantity_deltas(portfolio_id):
+    """
+    Returns a DataFrame of quantity changes indexed by date with one column
+    per asset id: buys add, sells subtract. Holdings without any
+    transaction count as bought on their purchase date.
+    """
+    records = _quantity_records([portfolio_id])
+    if records.empty:
+        return pd.DataFrame()
+    return records.pivot_table(index="date", columns="asset_id", values="quantity", aggfunc="sum", fill_value=0.0)
+
+def _quantity_records(portfolio_ids=None):
+    """
+    Returns one row per quantity change (portfolio_id, date, asset_id,
+    quantity) for the given portfolios, or all of them.
+    """
+    transactions = (
+        db.session.query(
+            Transaction.portfolio_id, Transaction.created_at, Transaction.quantity,
+            Transaction.transaction_type, Holding.asset_id,
+        )
+        .join(Holding, Transaction.holding_id == Holding.id)
+        .filter(Transaction.transaction_type.in_(('buy', 'sell')))
+    )
+    untraded = (
+        Holding.query
+        .filter(Holding.quantity > 0)
+        .filter(~Holding.id.in_(db.session.query(Transaction.holding_id).filter(Transaction.holding_id.isnot(None))))
+    )
+    if portfolio_ids is not None:
+        transactions = transactions.filter(Transaction.portfolio_id.in_(portfolio_ids))
+        untraded = untraded.filter(Holding.portfolio_id.in_(portfolio_ids))
+
+    records = [
+        (portfolio_id, created_at.date(), asset_id, quantity if transaction_type == 'buy' else -quantity)
+        for portfolio_id, created_at, quantity, transaction_type, asset_id in transactions
+    ]
+    records += [(h.portfolio_id, h.purchase_date.date(), h.asset_id, h.quantity) for h in untraded]
+
+    return pd.DataFrame(records, columns=["portfolio_id", "date", "asset_id", "quantity"])
+
+def _missing_asset_history(closes):
+    existing = set(
+        db.session.query(AssetHistory.asset_id, AssetHistory.date)
+        .filter(
+            AssetHistory.asset_id.in_([int(asset_id) for asset_id in closes.columns]),
+            AssetHistory.date >= closes.index.min(),
+            AssetHistory.date <= closes.index.max(),
+        )
+        .all()
+    )
+    rows = []
+    for asset_id in closes.columns:
+        for day, close in closes[asset_id].dropna().items():
+            if (asset_id, day) not in existing:
+                rows.append({"asset_id": int(asset_id), "date": day, "price": float(close)})
+    return rows
+
+def _missing_portfolio_history(portfolio_id, values):
+    existing = {
+        day for (day,) in db.session.query(PortfolioHistory.date)
+        .filter(
+            PortfolioHistory.portfolio_id == portfolio_id,
+            PortfolioHistory.date >= values.index.min(),
+            PortfolioHistory.date <= values.index.max(),
+        )
+    }
+    rows = []
+    for day, value in values.items():
+        if value == 0.0 or day in existing:
+            continue
+        rows.append({
+            "portfolio_id": portfolio_id,
+            "date": day,
+            "value": float(value),
+            "balance": round(float(value) * 0.10, 2),  # 10% as cash balance
+        })
+    return rows
+
+def _insert_portfolio_history(rows):
+    """
+    Bulk inserts portfolio_history rows, skipping any (portfolio, day)
+    another worker wrote in the meantime. Relies on
+    uq_portfolio_history_portfolio_date. Returns the number of rows
+    actually written.
+
+    This is a Core insert, so the rowcount is available, and the
+    portfolio_id column goes by its database name.
+    """
+    table = PortfolioHistory.__table__
+    statement = (
+        insert(table)
+        .prefix_with("IGNORE", dialect="mysql")
+        .prefix_with("OR IGNORE", dialect="sqlite")
+    )
+    column = PortfolioHistory.portfolio_id.property.columns[0].name
+    params = [{**row, column: row["portfolio_id"]} for row in rows]
+    for row in params:
+        del row["portfolio_id"]
+    return db.session.execute(statement, params).rowcount
+
+# Days the snapshot job looks back at most, and how far before that it looks for a last known close
+SNAPSHOT_MAX_DAYS = 31
+SNAPSHOT_PRICE_LOOKBACK_DAYS = 14
+
+def snapshot_portfolio_history(portfolio_ids=None, today=None):
+    """
+    Adds the missing daily portfolio_history rows of every portfolio (or
+    only portfolio_ids) since its last snapshot, up to yesterday and at
+    most SNAPSHOT_MAX_DAYS back. Today is left out until it is over, so
+    a stored day is never valued from an earlier close. Portfolios
+    without history start yesterday.
+
+    Days are valued from stored asset_history closes carried forward. A
+    quote from the cache (fetch_latest_prices) only fills the last day
+    when it has no stored close and the quote was taken on it; the
+    asset's persisted last price is the final fallback. Quantities in effect on each day come from the
+    transactions. All new rows are written in one bulk insert that skips
+    days already stored, so overlapping runs from several workers write
+    each day once. Returns the number of rows written.
+    """
+    today = today or datetime.now(timezone.utc).date()
+    last_day = today - timedelta(days=1)
+    window_start = today - timedelta(days=SNAPSHOT_MAX_DAYS)
+
+    portfolios = Portfolio.query
+    if portfolio_ids is not None:
+        portfolios = portfolios.filter(Portfolio.id.in_(portfolio_ids))
+    portfolio_ids = [portfolio.id for portfolio in portfolios]
+    if not portfolio_ids:
+        return 0
+
+    last_snapshot = dict(
+        db.session.query(PortfolioHistory.portfolio_id, func.max(PortfolioHistory.date))
+        .filter(PortfolioHistory.portfolio_id.in_(portfolio_ids))
+        .group_by(PortfolioHistory.portfolio_id)
+        .all()
+    )
+    first_missing = {
+        portfolio_id: max(last_snapshot[portfolio_id] + timedelta(days=1), window_start)
+        if portfolio_id in last_snapshot else last_day
+        for portfolio_id in portfolio_ids
+    }
+    pending = [portfolio_id for portfolio_id in portfolio_ids if first_missing[portfolio_id] <= last_day]
+    if not pending:
+        return 0
+
+    start = min(first_missing[portfolio_id] for portfolio_id in pending)
+    days = pd.Index([start + timedelta(days=i) for i in range((last_day - start).days + 1)])
+
+    records = _quantity_records(pending)
+    values = pd.DataFrame(0.0, index=days, columns=pending)
+    if not records.empty:
+        deltas = records.pivot_table(
+            index="date", columns=["portfolio_id", "asset_id"], values="quantity", aggfunc="sum", fill_value=0.0
+        )
+        quantities = deltas.reindex(deltas.index.union(days), fill_value=0.0).cumsum().reindex(days)
+
+        prices = _daily_prices([int(asset_id) for asset_id in records["asset_id"].unique()], start, last_day, days)
+        prices = prices.reindex(columns=quantities.columns.get_level_values("asset_id"))
+        held = quantities.to_numpy() * prices.fillna(0.0).to_numpy()
+        values = (
+            pd.DataFrame(held, index=days, columns=quantities.columns)
+            .T.groupby(level="portfolio_id").sum().T
+            .reindex(columns=pending, fill_value=0.0)
+        )
+
+    rows = []
+    for portfolio_id in pending:
+        for day, value in values[portfolio_id].items():
+            if day >= first_missing[portfolio_id]:
+                rows.append({
+                    "portfolio_id": portfolio_id,
+                    "date": day,
+                    "value": round(float(value), 2),
+                    "balance": round(float(value) * 0.10, 2),  # 10% as cash balance
+                })
+
+    written = 0
+    if rows:
+        written = _insert_portfolio_history(rows)
+        db.session.commit()
+    print(f"Portfolio snapshot wrote {written} rows for {len(pending)} portfolios")
+    return written
+
+def _quote_day(quote):
+    """UTC date a quote was taken on, or None if it has no price or time."""
+    if not quote or quote.get("price") is None or not quote.get("update_time"):
+        return None
+    return datetime.fromisoformat(quote["update_time"]).astimezone(timezone.utc).date()
+
+def _daily_prices(asset_ids, start, end, days):
+    """
+    Returns a days × asset id frame of closes: stored asset_history carried
+    forward, the latest quote on end when end has no stored close and the
+    quote was taken that day, then the asset's last price where nothing
+    else is known.
+    """
+    from app.services.asset_service import fetch_latest_prices
+
+    dates, matrix = price_store.read_aligned(
+        asset_ids, start=start - timedelta(days=SNAPSHOT_PRICE_LOOKBACK_DAYS), end=end
+    )
+    closes = pd.DataFrame(matrix.T, index=[day.item() for day in dates], columns=asset_ids)
+    prices = closes.reindex(closes.index.union(days)).sort_index().ffill().reindex(days)
+
+    assets = Asset.query.filter(Asset.id.in_(asset_ids)).all()
+    quotes = fetch_latest_prices([asset.symbol.upper() for asset in assets])
+    for asset in assets:
+        # The live quote only stands in for a missing close, and only if it was taken on end itself
+        stored = end in closes.index and pd.notna(closes.at[end, asset.id])
+        quote = quotes.get(asset.symbol.upper())
+        if not stored and _quote_day(quote) == end:
+            prices.loc[end, asset.id] = quote["price"]
+        if asset.last_price is not None:
+            prices[asset.id] = prices[asset.id].fillna(asset.last_price)
+
+    return prices
@@ -0,0 +1,157 @@
+from sqlalchemy import func
+
+from app import db
+from app.models.holding import Holding
+from app.models.position import Position
+from app.models.transaction import Transaction
+from app.services.valuation_service import invalidate_valuation, value_portfolio
+
+# Quantities and amounts closer than this are treated as equal (float drift from fractional shares)
+POSITION_TOLERANCE = 1e-6
+
+
+def get_positions(portfolio_id):
+    """
+    Returns one open position per asset held in a portfolio, keyed by
+    symbol, priced by the valuation engine.
+
+    Each position has quantity, total_cost, avg_cost (the quantity
+    weighted purchase price), current_price, market_value, day_changeP
+    and asset_return = (market_value - total_cost) / total_cost.
+    """
+    valuation = value_portfolio(portfolio_id)
+    return valuation["positions"] if valuation else {}
+
+
+def format_holdings(positions):
+    """Shapes get_positions output into the /holdings/portfolio/<id> response."""
+    return {
+        symbol: {
+            'quantity': position['quantity'],
+            'current_price': position['current_price'],
+            'asset_name': position['name'],
+            'asset_symbol': symbol,
+            'asset_id': position['asset_id'],
+            'asset_type': position['asset_type'],
+            'asset_sector': position['sector'],
+            'asset_dayChangeP': position['day_changeP'],
+            'purchase_price': position['avg_cost'],
+            'asset_return': position['asset_return'],
+        }
+        for symbol, position in positions.items()
+    }
+
+
+def _get_or_create_position(portfolio_id, asset_id):
+    position = Position.query.filter_by(portfolio_id=portfolio_id, asset_id=asset_id).first()
+    if position is None:
+        position = Position(portfolio_id, asset_id)
+        db.session.add(position)
+    return position
+
+
+def apply_buy(portfolio_id, asset_id, quantity, price):
+    """
+    Adds a bought lot to its position. Only changes the session, so the
+    caller commits it together with the lot.
+    """
+    invalidate_valuation(portfolio_id)
+    position = _get_or_create_position(portfolio_id, asset_id)
+    position.quantity += quantity
+    position.total_cost += quantity * price
+    return position
+
+
+def apply_sell(portfolio_id, asset_id, quantity, price, purchase_price):
+    """
+    Removes quantity sold out of a lot bought at purchase_price from its
+    position and books the realized P&L. Only changes the session.
+    """
+    invalidate_valuation(portfolio_id)
+    position = _get_or_create_position(portfolio_id, asset_id)
+    position.quantity -= quantity
+    position.total_cost -= quantity * purchase_price
+    position.realized_pnl += quantity * (price - purchase_price)
+
+    if abs(position.quantity) < POSITION_TOLERANCE:
+        position.quantity = 0.0
+        position.total_cost = 0.0
+    return position
+
+
+def rebuild_positions(portfolio_id=None, asset_id=None, check=False):
+    """
+    Recomputes positions from holding lots and sell transactions.
+    Quantity and total cost are summed over open lots; realized P&L is
+    summed over sells against the purchase price of their lot.
+
+    Returns a list of {"portfolio_id", "asset_id", "field", "stored",
+    "expected"} for every value that differed. With check set nothing is
+    written; otherwise the differences are fixed in the session and the
+    caller commits.
+    """
+    lots = db.session.query(
+        Holding.portfolio_id,
+        Holding.asset_id,
+        func.sum(Holding.quantity),
+        func.sum(Holding.quantity * Holding.purchase_price),
+    ).filter(Holding.quantity > 0)
+
+    sells = db.session.query(
+        Holding.portfolio_id,
+        Holding.asset_id,
+        func.sum(Transaction.quantity * (Transaction.price - Holding.purchase_price)),
+    ).join(Holding, Transaction.holding_id == Holding.id).filter(Transaction.transaction_type == 'sell')
+
+    positions = Position.query
+    if portfolio_id is not None:
+        lots = lots.filter(Holding.portfolio_id == portfolio_id)
+        sells = sells.filter(Holding.portfolio_id == portfolio_id)
+        positions = positions.filter(Position.portfolio_id == portfolio_id)
+    if asset_id is not None:
+        lots = lots.filter(Holding.asset_id == asset_id)
+        sells = sells.filter(Holding.asset_id == asset_id)
+        positions = positions.filter(Position.asset_id == asset_id)
+
+    expected = {}
+    for key_portfolio, key_asset, quantity, total_cost in lots.group_by(Holding.portfolio_id, Holding.asset_id):
+        expected[(key_portfolio, key_asset)] = {
+            "quantity": float(quantity or 0.0),
+            "total_cost": float(total_cost or 0.0),
+            "realized_pnl": 0.0,
+        }
+    for key_portfolio, key_asset, realized_pnl in sells.group_by(Holding.portfolio_id, Holding.asset_id):
+        values = expected.setdefault(
+            (key_portfolio, key_asset), {"quantity": 0.0, "total_cost": 0.0, "realized_pnl": 0.0}
+        )
+        values["realized_pnl"] = float(realized_pnl or 0.0)
+
+    stored = {(position.portfolio_id, position.asset_id): position for position in positions.all()}
+    empty = {"quantity": 0.0, "total_cost": 0.0, "realized_pnl": 0.0}
+
+    differences = []
+    for key in set(expected) | set(stored):
+        values = expected.get(key, empty)
+        position = stored.get(key)
+        for field, value in values.items():
+            current = getattr(position, field) if position is not None else 0.0
+            if abs(current - value) > POSITION_TOLERANCE:
+                differences.append({
+                    "portfolio_id": key[0],
+                    "asset_id": key[1],
+                    "field": field,
+                    "stored": current,
+                    "expected": value,
+                })
+
+        if check:
+            continue
+        if position is None:
+            db.session.add(Position(key[0], key[1], **values))
+        elif key not in expected:
+            db.session.delete(position)
+        else:
+            for field, value in values.items():
+                setattr(position, field, value)
+
+    return differences
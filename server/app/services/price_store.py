@@ -0,0 +1,213 @@
+import os
+import shutil
+import threading
+from contextlib import contextmanager
+
+import numpy as np
+
+try:
+    import fcntl
+except ImportError:  # Windows: only in-process locking
+    fcntl = None
+
+from app import db
+from app.models.asset_history import AssetHistory
+
+
+class PriceStore:
+    """
+    Columnar copy of asset_history: per asset, one sorted datetime64[D]
+    date array and one float64 price array, saved as <asset_id>.dates.npy
+    and <asset_id>.prices.npy under directory and read back memory-mapped.
+
+    asset_history stays the source of truth. A series is built from it the
+    first time it is read; after that, writes to asset_history are merged
+    in with upsert (or the series is dropped with invalidate and rebuilt
+    on the next read). Files are replaced atomically and reloaded when
+    another process changes them.
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+        self._series = {}
+        self._lock = threading.Lock()
+        self._asset_locks = {}
+
+    def read(self, asset_id, start=None, end=None):
+        """
+        Returns (dates, prices) for one asset, limited to start <= date <= end
+        when given. Needs an app context the first time an asset is read.
+        """
+        dates, prices = self._load(asset_id)
+        lo, hi = _bounds(dates, start, end)
+        return dates[lo:hi], prices[lo:hi]
+
+    def read_aligned(self, asset_ids, start=None, end=None, forward_fill=False):
+        """
+        Returns (dates, prices) where dates is the sorted union of every
+        asset's dates in range and prices is a len(asset_ids) × len(dates)
+        float64 matrix, NaN where an asset has no price (or, with
+        forward_fill, no earlier price in range).
+        """
+        series = [self.read(asset_id, start, end) for asset_id in asset_ids]
+        dates = np.unique(np.concatenate([d for d, _ in series])) if series else np.array([], dtype="datetime64[D]")
+        matrix = np.full((len(series), len(dates)), np.nan)
+        for row, (asset_dates, asset_prices) in enumerate(series):
+            matrix[row, np.searchsorted(dates, asset_dates)] = asset_prices
+
+        if forward_fill and matrix.size:
+            # Index of the last known price at or before each column, per row
+            known = np.where(~np.isnan(matrix), np.arange(matrix.shape[1]), 0)
+            np.maximum.accumulate(known, axis=1, out=known)
+            matrix = matrix[np.arange(matrix.shape[0])[:, None], known]
+        return dates, matrix
+
+    def upsert(self, asset_id, dates, prices):
+        """
+        Merges (date, price) pairs into an asset's series, replacing prices
+        on dates already stored. Series not built yet are left alone, since
+        they will be read from asset_history in full.
+        """
+        new_dates = np.asarray(dates, dtype="datetime64[D]")
+        new_prices = np.asarray(prices, dtype=np.float64)
+        if not new_dates.size:
+            return
+
+        with self._asset_lock(asset_id):
+            if not os.path.exists(self._path(asset_id, "dates")):
+                return
+            old_dates, old_prices = self._read_files(asset_id)
+
+            # New values first so np.unique keeps them over the stored ones
+            all_dates = np.concatenate([new_dates, old_dates])
+            all_prices = np.concatenate([new_prices, old_prices])
+            merged_dates, first = np.unique(all_dates, return_index=True)
+            self._write_files(asset_id, merged_dates, all_prices[first])
+
+    def invalidate(self, asset_id):
+        """Drops an asset's series; the next read rebuilds it from asset_history."""
+        with self._asset_lock(asset_id):
+            for kind in ("dates", "prices"):
+                try:
+                    os.remove(self._path(asset_id, kind))
+                except FileNotFoundError:
+                    pass
+        with self._lock:
+            self._series.pop(asset_id, None)
+
+    def clear(self):
+        """Drops every series, for example after the database is reseeded."""
+        with self._lock:
+            self._series.clear()
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def _load(self, asset_id):
+        dates_path = self._path(asset_id, "dates")
+        try:
+            version = os.stat(dates_path).st_mtime_ns
+        except FileNotFoundError:
+            version = None
+
+        with self._lock:
+            cached = self._series.get(asset_id)
+        if cached is not None and version is not None and cached[0] == version:
+            return cached[1], cached[2]
+
+        with self._asset_lock(asset_id):
+            if not os.path.exists(dates_path):
+                self._build(asset_id)
+            dates, prices = self._read_files(asset_id)
+            version = os.stat(dates_path).st_mtime_ns
+
+        with self._lock:
+            self._series[asset_id] = (version, dates, prices)
+        return dates, prices
+
+    def _build(self, asset_id):
+        rows = (
+            db.session.query(AssetHistory.date, AssetHistory.price)
+            .filter(AssetHistory.asset_id == asset_id)
+            .order_by(AssetHistory.date)
+            .all()
+        )
+        dates = np.array([day for day, _ in rows], dtype="datetime64[D]")
+        prices = np.array([price for _, price in rows], dtype=np.float64)
+        # asset_history does not enforce one row per day, so keep the last price per date
+        if dates.size:
+            reversed_dates, last = np.unique(dates[::-1], return_index=True)
+            dates, prices = reversed_dates, prices[::-1][last]
+        self._write_files(asset_id, dates, prices)
+
+    def _read_files(self, asset_id):
+        dates = np.load(self._path(asset_id, "dates"), mmap_mode="r")
+        prices = np.load(self._path(asset_id, "prices"), mmap_mode="r")
+        if len(dates) != len(prices):
+            raise RuntimeError(f"Price store files for asset {asset_id} are out of step")
+        return dates, prices
+
+    def _write_files(self, asset_id, dates, prices):
+        os.makedirs(self.directory, exist_ok=True)
+        # Prices go first and dates last: readers check the dates file's mtime
+        for kind, values in (("prices", prices), ("dates", dates)):
+            path = self._path(asset_id, kind)
+            tmp_path = f"{path}.{os.getpid()}.tmp.npy"
+            np.save(tmp_path, values)
+            os.replace(tmp_path, path)
+
+    @contextmanager
+    def _asset_lock(self, asset_id):
+        with self._lock:
+            lock = self._asset_locks.setdefault(asset_id, threading.Lock())
+        with lock:
+            if fcntl is None:
+                yield
+                return
+            os.makedirs(self.directory, exist_ok=True)
+            with open(os.path.join(self.directory, f"{asset_id}.lock"), "w") as lock_file:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+                try:
+                    yield
+                finally:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _path(self, asset_id, kind):
+        return os.path.join(self.directory, f"{int(asset_id)}.{kind}.npy")
+
+
+def _bounds(dates, start, end):
+    lo = np.searchsorted(dates, np.datetime64(start, "D")) if start is not None else 0
+    hi = np.searchsorted(dates, np.datetime64(end, "D"), side="right") if end is not None else len(dates)
+    return lo, hi
+
+
+class PriceStoreHandle:
+    """
+    Module-level handle to the active store, so that
+    `from app.services.price_store import price_store` keeps working
+    after configure_price_store sets the directory at startup.
+    """
+
+    def __init__(self, store):
+        self.store = store
+
+    def __getattr__(self, name):
+        return getattr(self.store, name)
+
+
+def configure_price_store(directory):
+    """Points the module-level price store at directory."""
+    price_store.store = PriceStore(directory)
+    return price_store
+
+
+def sync_price_rows(rows):
+    """Merges asset_history rows (dicts with asset_id, date and price) into the price store."""
+    by_asset = {}
+    for row in rows:
+        by_asset.setdefault(row["asset_id"], []).append((row["date"], row["price"]))
+    for asset_id, pairs in by_asset.items():
+        dates, prices = zip(*pairs)
+        price_store.upsert(asset_id, dates, prices)
+
+
+price_store = PriceStoreHandle(PriceStore(os.path.join("instance", "price_store")))
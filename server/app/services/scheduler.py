@@ -0,0 +1,125 @@
+import atexit
+import threading
+import time
+
+
+class Scheduler:
+    """
+    Runs periodic jobs on one background thread inside the app context.
+    Jobs run one after another; a failing job is logged and retried on
+    its next interval.
+    """
+
+    def __init__(self, app):
+        self.app = app
+        self.jobs = []
+        self._stop = threading.Event()
+        self._thread = None
+
+    def add_job(self, name, interval, func, run_at_start=True):
+        self.jobs.append({
+            "name": name,
+            "interval": interval,
+            "func": func,
+            "next_run": time.monotonic() if run_at_start else time.monotonic() + interval,
+            "runs": 0,
+            "last_duration": None,
+            "last_error": None,
+        })
+
+    def start(self):
+        if self._thread is not None or not self.jobs:
+            return
+        self._thread = threading.Thread(target=self._run, name="scheduler", daemon=True)
+        self._thread.start()
+        atexit.register(self.stop)
+        print(f"Scheduler started with jobs: {', '.join(job['name'] for job in self.jobs)}")
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=10)
+
+    def status(self):
+        return [
+            {key: job[key] for key in ("name", "interval", "runs", "last_duration", "last_error")}
+            for job in self.jobs
+        ]
+
+    def _run(self):
+        while not self._stop.is_set():
+            for job in self.jobs:
+                if self._stop.is_set():
+                    break
+                if time.monotonic() >= job["next_run"]:
+                    self._run_job(job)
+
+            next_run = min(job["next_run"] for job in self.jobs)
+            self._stop.wait(max(next_run - time.monotonic(), 0.1))
+
+    def _run_job(self, job):
+        started = time.monotonic()
+        try:
+            with self.app.app_context():
+                job["func"]()
+            job["last_error"] = None
+        except Exception as e:
+            job["last_error"] = str(e)
+            print(f"Scheduled job {job['name']} failed: {e}")
+        finally:
+            job["runs"] += 1
+            job["last_duration"] = round(time.monotonic() - started, 3)
+            job["next_run"] = time.monotonic() + job["interval"]
+
+
+def init_scheduler(app):
+    """Registers the background jobs enabled in the app config and starts the scheduler."""
+    scheduler = Scheduler(app)
+    app.extensions["scheduler"] = scheduler
+
+    if not app.config["SCHEDULER_ENABLED"]:
+        return scheduler
+
+    if app.config["QUOTE_REFRESH_ENABLED"]:
+        from app.services.asset_service import refresh_tracked_quotes
+
+        batch_size = app.config["QUOTE_REFRESH_BATCH_SIZE"]
+        scheduler.add_job(
+            "quote_refresh",
+            app.config["QUOTE_REFRESH_INTERVAL"],
+            lambda: refresh_tracked_quotes(batch_size=batch_size),
+        )
+
+    if app.config["MARKET_MOVERS_ENABLED"]:
+        from app.services.movers_service import refresh_movers_snapshot
+
+        universe = app.config["MARKET_MOVERS_UNIVERSE"]
+        top_k = app.config["MARKET_MOVERS_TOP_K"]
+        scheduler.add_job(
+            "market_movers",
+            app.config["MARKET_MOVERS_INTERVAL"],
+            lambda: refresh_movers_snapshot(universe=universe, k=top_k),
+        )
+
+    if app.config["PORTFOLIO_SNAPSHOT_ENABLED"]:
+        from app.services.portfolio_service import snapshot_portfolio_history
+        scheduler.add_job(
+            "portfolio_snapshot",
+            app.config["PORTFOLIO_SNAPSHOT_INTERVAL"],
+            snapshot_portfolio_history,
+        )
+
+    from app.services.history_buffer import flush_history_buffer
+    scheduler.add_job(
+        "asset_history_flush",
+        app.config["ASSET_HISTORY_FLUSH_INTERVAL"],
+        flush_history_buffer,
+        run_at_start=False,
+    )
+
+    # Picks up assets created by other worker processes
+    from app.services.search_index import build_search_index
+    scheduler.add_job("search_index", app.config["SEARCH_INDEX_REBUILD_INTERVAL"], build_search_index)
+
+    scheduler.start()
+    return scheduler
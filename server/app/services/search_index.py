@@ -0,0 +1,181 @@
+import threading
+import time
+
+# Name n-grams are indexed for every length from 1 to NGRAM_SIZE
+NGRAM_SIZE = 3
+
+# Rank of each kind of match, lower is better
+EXACT_SYMBOL = 0
+SYMBOL_PREFIX = 1
+NAME_PREFIX = 2
+NAME_WORD_PREFIX = 3
+SYMBOL_SUBSTRING = 4
+NAME_SUBSTRING = 5
+
+
+class _TrieNode:
+    __slots__ = ("children", "ids")
+
+    def __init__(self):
+        self.children = {}
+        self.ids = set()
+
+
+class AssetSearchIndex:
+    """
+    In-memory index over the assets table for /assets/search.
+    Symbols go in a trie (every node keeps the ids below it, so a prefix
+    lookup is one walk). Symbols and names are also split into n-grams
+    for substring matches, which are confirmed against the text.
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._clear()
+        self.ready = False
+        self.built_at = None
+
+    def _clear(self):
+        self._assets = {}
+        self._trie = _TrieNode()
+        self._grams = {}
+
+    def build(self, assets):
+        """Replaces the index contents with the given Asset rows."""
+        with self._lock:
+            self._clear()
+            for asset in assets:
+                self._add(_entry(asset))
+            self.ready = True
+            self.built_at = time.time()
+        print(f"Built asset search index with {len(self._assets)} assets")
+
+    def add(self, asset):
+        """Adds or replaces one Asset row."""
+        with self._lock:
+            self._remove(asset.id)
+            self._add(_entry(asset))
+
+    def remove(self, asset_id):
+        with self._lock:
+            self._remove(asset_id)
+
+    def search(self, term, limit=10):
+        """Returns up to limit asset dicts matching term, best matches first."""
+        term = term.strip().lower()
+        if not term:
+            return []
+
+        with self._lock:
+            ranks = {}
+            for asset_id in self._symbol_prefix(term):
+                symbol = self._assets[asset_id]["_symbol"]
+                ranks[asset_id] = EXACT_SYMBOL if symbol == term else SYMBOL_PREFIX
+
+            for asset_id in self._substring(term):
+                if asset_id in ranks:
+                    continue
+                entry = self._assets[asset_id]
+                if entry["_name"].startswith(term):
+                    ranks[asset_id] = NAME_PREFIX
+                elif (" " + term) in entry["_name"]:
+                    ranks[asset_id] = NAME_WORD_PREFIX
+                elif term in entry["_symbol"]:
+                    ranks[asset_id] = SYMBOL_SUBSTRING
+                elif term in entry["_name"]:
+                    ranks[asset_id] = NAME_SUBSTRING
+
+            ranked = sorted(ranks, key=lambda asset_id: (ranks[asset_id], len(self._assets[asset_id]["_symbol"]), self._assets[asset_id]["_symbol"]))
+            return [_public(self._assets[asset_id]) for asset_id in ranked[:limit]]
+
+    def _symbol_prefix(self, term):
+        node = self._trie
+        for char in term:
+            node = node.children.get(char)
+            if node is None:
+                return set()
+        return node.ids
+
+    def _substring(self, term):
+        # Terms up to NGRAM_SIZE are indexed directly; longer ones intersect their n-grams
+        if len(term) <= NGRAM_SIZE:
+            return self._grams.get(term, set())
+
+        candidates = None
+        for gram in _ngrams(term, NGRAM_SIZE):
+            ids = self._grams.get(gram)
+            if not ids:
+                return set()
+            candidates = set(ids) if candidates is None else candidates & ids
+        return candidates or set()
+
+    def _add(self, entry):
+        asset_id = entry["id"]
+        self._assets[asset_id] = entry
+
+        node = self._trie
+        node.ids.add(asset_id)
+        for char in entry["_symbol"]:
+            node = node.children.setdefault(char, _TrieNode())
+            node.ids.add(asset_id)
+
+        for gram in _all_ngrams(entry):
+            self._grams.setdefault(gram, set()).add(asset_id)
+
+    def _remove(self, asset_id):
+        entry = self._assets.pop(asset_id, None)
+        if entry is None:
+            return
+
+        node = self._trie
+        node.ids.discard(asset_id)
+        for char in entry["_symbol"]:
+            node = node.children.get(char)
+            if node is None:
+                break
+            node.ids.discard(asset_id)
+
+        for gram in _all_ngrams(entry):
+            ids = self._grams.get(gram)
+            if ids is not None:
+                ids.discard(asset_id)
+                if not ids:
+                    del self._grams[gram]
+
+
+def _entry(asset):
+    return {
+        "id": asset.id,
+        "symbol": asset.symbol,
+        "name": asset.name,
+        "asset_type": asset.asset_type,
+        "sector": asset.sector,
+        "_symbol": asset.symbol.lower(),
+        "_name": (asset.name or "").lower(),
+    }
+
+
+def _public(entry):
+    return {key: value for key, value in entry.items() if not key.startswith("_")}
+
+
+def _ngrams(text, size):
+    return {text[i:i + size] for i in range(len(text) - size + 1)}
+
+
+def _all_ngrams(entry):
+    grams = set()
+    for text in (entry["_symbol"], entry["_name"]):
+        for size in range(1, NGRAM_SIZE + 1):
+            grams |= _ngrams(text, size)
+    return grams
+
+
+search_index = AssetSearchIndex()
+
+
+def build_search_index():
+    """Rebuilds the search index from the assets table. Needs an app context."""
+    from app.models.asset import Asset
+    search_index.build(Asset.query.all())
+    return search_index
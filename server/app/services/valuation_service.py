@@ -0,0 +1,245 @@
+import numpy as np
+from flask import g, has_app_context
+from sqlalchemy import func
+
+from app import db
+from app.models.asset import Asset
+from app.models.portfolio import Portfolio
+from app.models.position import Position
+from app.models.transaction import Transaction
+from app.services.asset_service import fetch_latest_prices
+
+# Quantities at or below this are treated as closed positions
+OPEN_QUANTITY = 1e-6
+
+
+def value_portfolio(portfolio_id, quotes=None, extra_symbols=()):
+    """
+    Values a portfolio from its positions in one pass.
+    Positions are loaded into NumPy arrays, priced with one batched
+    quote lookup and reduced in vectorized form. The result is kept in
+    flask.g, so every caller in the same request shares it.
+
+    value = market value of open positions + balance - initial balance
+    return = (value - total invested in buys) / total invested
+    Quotes already fetched by the caller can be passed in a quotes dict
+    and are used instead of looking those symbols up again. extra_symbols
+    are priced in the same quote lookup as the positions, and every quote
+    fetched is added to quotes so the caller can reuse it.
+    Returns None if the portfolio does not exist.
+    """
+    valuations = _request_valuations()
+    if valuations is not None and portfolio_id in valuations:
+        missing = [symbol for symbol in extra_symbols if quotes is not None and symbol not in quotes]
+        if missing:
+            quotes.update(fetch_latest_prices(missing))
+        return valuations[portfolio_id]
+
+    valuation = _compute_valuation(portfolio_id, quotes, extra_symbols)
+    if valuations is not None:
+        valuations[portfolio_id] = valuation
+    return valuation
+
+
+def invalidate_valuation(portfolio_id):
+    """Drops the valuation cached for this request, after a buy or sell."""
+    valuations = _request_valuations()
+    if valuations is not None:
+        valuations.pop(portfolio_id, None)
+
+
+def _request_valuations():
+    if not has_app_context():
+        return None
+    if "valuations" not in g:
+        g.valuations = {}
+    return g.valuations
+
+
+def _compute_valuation(portfolio_id, quotes=None, extra_symbols=()):
+    portfolio = db.session.get(Portfolio, portfolio_id)
+    if portfolio is None:
+        return None
+
+    rows = (
+        db.session.query(
+            Asset.id,
+            Asset.symbol,
+            Asset.name,
+            Asset.asset_type,
+            Asset.sector,
+            Asset.last_price,
+            Position.quantity,
+            Position.total_cost,
+            Position.realized_pnl,
+        )
+        .join(Position, Position.asset_id == Asset.id)
+        .filter(Position.portfolio_id == portfolio_id)
+        .all()
+    )
+
+    invested = db.session.query(
+        func.coalesce(func.sum(Transaction.quantity * Transaction.price), 0.0)
+    ).filter(Transaction.portfolio_id == portfolio_id, Transaction.transaction_type == 'buy').scalar()
+    invested = float(invested)
+
+    arrays, quotes = _price_positions(rows, quotes, extra_symbols)
+    quantity, cost, realized = arrays["quantity"], arrays["cost"], arrays["realized"]
+    avg_cost, price, is_open = arrays["avg_cost"], arrays["price"], arrays["is_open"]
+    market_value, open_cost, unrealized = arrays["market_value"], arrays["open_cost"], arrays["unrealized"]
+    asset_return = np.divide(unrealized, open_cost, out=np.zeros_like(cost), where=open_cost != 0)
+    day_changeP = [_quote_field(quotes, row.symbol, "day_changeP") for row in rows]
+
+    value = float(market_value.sum()) + portfolio.balance - portfolio._INIT_BALANCE
+
+    positions = {}
+    for i in np.flatnonzero(is_open):
+        row = rows[i]
+        positions[row.symbol] = {
+            "asset_id": row.id,
+            "symbol": row.symbol,
+            "name": row.name,
+            "asset_type": row.asset_type,
+            "sector": row.sector,
+            "quantity": float(quantity[i]),
+            "total_cost": float(cost[i]),
+            "avg_cost": float(avg_cost[i]),
+            "current_price": float(price[i]),
+            "market_value": float(market_value[i]),
+            "unrealized_pnl": float(unrealized[i]),
+            "realized_pnl": float(realized[i]),
+            "day_changeP": None if np.isnan(day_changeP[i]) else day_changeP[i],
+            "asset_return": float(asset_return[i]),
+        }
+
+    return {
+        "portfolio_id": portfolio_id,
+        "balance": portfolio.balance,
+        "market_value": float(market_value.sum()),
+        "total_cost": float(open_cost.sum()),
+        "unrealized_pnl": float(unrealized.sum()),
+        "realized_pnl": float(realized.sum()),
+        "invested": invested,
+        "value": value,
+        "return": (value - invested) / invested if invested else 0.0,
+        "positions": positions,
+    }
+
+
+def value_portfolios(portfolio_ids=None):
+    """
+    Values every portfolio, or only portfolio_ids, in one pass: one
+    query for all their positions, one batched quote lookup over the
+    union of open symbols and a per-portfolio reduction with
+    np.bincount. Uses the same formulas as value_portfolio, without the
+    per-position breakdown.
+    """
+    portfolios = Portfolio.query.order_by(Portfolio.id)
+    positions = db.session.query(
+        Position.portfolio_id,
+        Asset.symbol,
+        Asset.last_price,
+        Position.quantity,
+        Position.total_cost,
+        Position.realized_pnl,
+    ).join(Asset, Position.asset_id == Asset.id)
+    invested = db.session.query(
+        Transaction.portfolio_id,
+        func.sum(Transaction.quantity * Transaction.price),
+    ).filter(Transaction.transaction_type == 'buy')
+
+    if portfolio_ids is not None:
+        portfolios = portfolios.filter(Portfolio.id.in_(portfolio_ids))
+        positions = positions.filter(Position.portfolio_id.in_(portfolio_ids))
+        invested = invested.filter(Transaction.portfolio_id.in_(portfolio_ids))
+
+    portfolios = portfolios.all()
+    if not portfolios:
+        return []
+
+    index = {portfolio.id: i for i, portfolio in enumerate(portfolios)}
+    rows = [row for row in positions.all() if row.portfolio_id in index]
+    invested_by_id = dict(invested.group_by(Transaction.portfolio_id).all())
+
+    arrays, _ = _price_positions(rows)
+    owner = np.array([index[row.portfolio_id] for row in rows], dtype=np.intp)
+    size = len(portfolios)
+
+    market_value = np.bincount(owner, weights=arrays["market_value"], minlength=size)
+    total_cost = np.bincount(owner, weights=arrays["open_cost"], minlength=size)
+    unrealized = np.bincount(owner, weights=arrays["unrealized"], minlength=size)
+    realized = np.bincount(owner, weights=arrays["realized"], minlength=size)
+
+    balance = np.array([portfolio.balance for portfolio in portfolios], dtype=np.float64)
+    initial = np.array([portfolio._INIT_BALANCE for portfolio in portfolios], dtype=np.float64)
+    total_invested = np.array(
+        [float(invested_by_id.get(portfolio.id) or 0.0) for portfolio in portfolios], dtype=np.float64
+    )
+    value = market_value + balance - initial
+    returns = np.divide(value - total_invested, total_invested, out=np.zeros(size), where=total_invested != 0)
+
+    return [
+        {
+            "portfolio_id": portfolio.id,
+            "name": portfolio.name,
+            "balance": portfolio.balance,
+            "market_value": float(market_value[i]),
+            "total_cost": float(total_cost[i]),
+            "unrealized_pnl": float(unrealized[i]),
+            "realized_pnl": float(realized[i]),
+            "invested": float(total_invested[i]),
+            "value": float(value[i]),
+            "return": float(returns[i]),
+        }
+        for i, portfolio in enumerate(portfolios)
+    ]
+
+
+def _price_positions(rows, quotes=None, extra_symbols=()):
+    """
+    Turns position rows (with symbol, last_price, quantity, total_cost
+    and realized_pnl) into arrays and prices the open ones, plus
+    extra_symbols, with one quote lookup, skipping symbols already in
+    quotes. Fetched quotes are added to quotes when a dict is passed in.
+    Returns (arrays, quotes).
+    """
+    quantity = np.array([row.quantity for row in rows], dtype=np.float64)
+    cost = np.array([row.total_cost for row in rows], dtype=np.float64)
+    realized = np.array([row.realized_pnl for row in rows], dtype=np.float64)
+    last_price = np.array([np.nan if row.last_price is None else row.last_price for row in rows], dtype=np.float64)
+    is_open = quantity > OPEN_QUANTITY
+
+    quotes = {} if quotes is None else quotes
+    held_symbols = [row.symbol for row, held in zip(rows, is_open) if held]
+    open_symbols = [
+        symbol for symbol in dict.fromkeys(held_symbols + list(extra_symbols)) if symbol not in quotes
+    ]
+    if open_symbols:
+        quotes.update(fetch_latest_prices(open_symbols))
+    quote_price = np.array([_quote_field(quotes, row.symbol, "price") for row in rows], dtype=np.float64)
+
+    # Fall back to the persisted last price, then the cost basis, when there is no quote
+    avg_cost = np.divide(cost, quantity, out=np.zeros_like(cost), where=quantity != 0)
+    price = np.where(np.isnan(quote_price), last_price, quote_price)
+    price = np.where(np.isnan(price), avg_cost, price)
+
+    market_value = np.where(is_open, quantity * price, 0.0)
+    open_cost = np.where(is_open, cost, 0.0)
+
+    arrays = {
+        "quantity": quantity,
+        "cost": cost,
+        "realized": realized,
+        "avg_cost": avg_cost,
+        "price": price,
+        "is_open": is_open,
+        "market_value": market_value,
+        "open_cost": open_cost,
+        "unrealized": market_value - open_cost,
+    }
+    return arrays, quotes
+
+
+def _quote_field(quotes, symbol, field):
+    value = (quotes.get(symbol) or {}).get(field)
+    return np.nan if value is None else value
@@ -81,6 +81,22 @@ def remove_from_watchlist_by_asset(portfolio_id, asset_id):
 
     return True
 
+def format_watchlist(watchlist_items, quotes):
+    """
+    Serializes watchlist items with current price, day change and
+    day change percent taken from quotes (as returned by fetch_latest_prices).
+    """
+    enhanced_items = []
+    for item in watchlist_items:
+        item_data = item.serialize()
+        if item.asset and item.asset.symbol in quotes:
+            price_info = quotes[item.asset.symbol]
+            item_data['current_price'] = price_info.get('price')
+            item_data['day_change'] = price_info.get('day_change')
+            item_data['day_changeP'] = price_info.get('day_changeP')
+        enhanced_items.append(item_data)
+    return enhanced_items
+
 def get_watchlist_by_portfolio(portfolio_id):
     """
     Gets all watchlist items for a specific portfolio.
@@ -11,6 +11,7 @@ from app.models.asset_history import AssetHistory
 from app.models.holding import Holding
 from app.models.transaction import Transaction
 from app.services.asset_service import fetch_latest_price
+from app.services.price_store import price_store
 
 
 def generate_random_date_2024():
@@ -354,6 +355,7 @@ def generate_asset_history(asset_id, current_price, day_changeP, years=3):
     if history_records:
         db.session.bulk_save_objects(history_records)
         db.session.commit()
+        price_store.invalidate(asset_id)
         print(f"✅ Generated {len(history_records)} price history records for asset {asset_id}")
     else:
         print("ℹ️ No new asset records to generate (already exists)")
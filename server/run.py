@@ -1,6 +1,17 @@
+import os
+
 from app import create_app
 
-app = create_app()
+DEBUG = True
+
+# Started with `python run.py`, the debug reloader runs this script twice: a parent that only
+# watches for changes and a serving child with WERKZEUG_RUN_MAIN set. Only the child runs
+# background jobs. Servers that import run:app (gunicorn, flask run) keep SCHEDULER_ENABLED.
+config = None
+if __name__ == "__main__" and DEBUG and os.environ.get("WERKZEUG_RUN_MAIN") != "true":
+    config = {"SCHEDULER_ENABLED": False}
+
+app = create_app(config)
 
 if __name__ == "__main__":
-    app.run(host="0.0.0.0", port=1313, debug=True)
+    app.run(host="0.0.0.0", port=1313, debug=DEBUG)
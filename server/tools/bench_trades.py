@@ -0,0 +1,93 @@
+"""
+Measures trade throughput of buy_asset and sell_asset.
+
+    python tools/bench_trades.py --database sqlite:////tmp/bench_trades.db
+    python tools/bench_trades.py --trades 500 --lots-per-sell 20
+
+Trades run against a scratch portfolio and asset at a fixed price, so no
+market data is fetched. Everything the benchmark creates is deleted at the
+end. Without --database the app's configured database is used.
+"""
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../')))
+
+from app import create_app, db
+from app.models.asset import Asset
+from app.models.holding import Holding
+from app.models.portfolio import Portfolio
+from app.models.position import Position
+from app.models.transaction import Transaction
+from app.services.holding_service import buy_asset, sell_asset
+
+BENCH_PRICE = 10.0
+
+
+def run_buys(portfolio_id, asset_id, trades):
+    start = time.perf_counter()
+    for _ in range(trades):
+        buy_asset(portfolio_id, asset_id, 1, BENCH_PRICE)
+    return time.perf_counter() - start
+
+
+def run_sells(portfolio_id, asset_id, trades, lots_per_sell):
+    # Each sell consumes lots_per_sell one-share lots, bought outside the timed section
+    elapsed = 0.0
+    for _ in range(trades):
+        for _ in range(lots_per_sell):
+            buy_asset(portfolio_id, asset_id, 1, BENCH_PRICE)
+        start = time.perf_counter()
+        sell_asset(portfolio_id, asset_id, lots_per_sell, BENCH_PRICE)
+        elapsed += time.perf_counter() - start
+    return elapsed
+
+
+def cleanup(portfolio_id, asset_id):
+    holding_ids = [h.id for h in Holding.query.filter_by(portfolio_id=portfolio_id)]
+    Transaction.query.filter(Transaction.holding_id.in_(holding_ids)).delete(synchronize_session=False)
+    Holding.query.filter_by(portfolio_id=portfolio_id).delete(synchronize_session=False)
+    Position.query.filter_by(portfolio_id=portfolio_id).delete(synchronize_session=False)
+    Portfolio.query.filter_by(id=portfolio_id).delete(synchronize_session=False)
+    Asset.query.filter_by(id=asset_id).delete(synchronize_session=False)
+    db.session.commit()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark buy and sell throughput.")
+    parser.add_argument("--database", help="SQLAlchemy URL to run against (tables are created if missing)")
+    parser.add_argument("--trades", type=int, default=200, help="number of buys and of sells to time")
+    parser.add_argument("--lots-per-sell", type=int, default=20, help="one-share lots consumed by each sell")
+    args = parser.parse_args()
+
+    config = {"SCHEDULER_ENABLED": False}
+    if args.database:
+        config["SQLALCHEMY_DATABASE_URI"] = args.database
+    app = create_app(config)
+
+    with app.app_context():
+        db.create_all()
+
+        portfolio = Portfolio(name="bench_trades")
+        portfolio.balance = 1e12
+        asset = Asset(symbol="BENCH_TRADES", name="Benchmark asset", asset_type="EQUITY", sector="N/A", day_changeP=0.0)
+        db.session.add_all([portfolio, asset])
+        db.session.commit()
+        portfolio_id, asset_id = portfolio.id, asset.id
+
+        try:
+            buy_seconds = run_buys(portfolio_id, asset_id, args.trades)
+            sell_seconds = run_sells(portfolio_id, asset_id, args.trades, args.lots_per_sell)
+        finally:
+            db.session.rollback()
+            cleanup(portfolio_id, asset_id)
+
+    print(f"buys:  {args.trades} in {buy_seconds:.2f}s, {args.trades / buy_seconds:.1f} trades/s")
+    print(f"sells: {args.trades} x {args.lots_per_sell} lots in {sell_seconds:.2f}s, {args.trades / sell_seconds:.1f} trades/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,47 @@
+"""
+Recomputes the positions table from holding lots and sell transactions.
+
+    python tools/rebuild_positions.py             # rebuild every position
+    python tools/rebuild_positions.py --check     # only report differences
+    python tools/rebuild_positions.py --portfolio 1
+
+Exits with status 1 when --check finds differences.
+"""
+
+import argparse
+import os
+import sys
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../')))
+
+from app import create_app, db
+from app.services.position_service import rebuild_positions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Rebuild the positions table from holdings and transactions.")
+    parser.add_argument("--check", action="store_true", help="report differences without writing")
+    parser.add_argument("--portfolio", type=int, help="only this portfolio id")
+    args = parser.parse_args()
+
+    app = create_app({"SCHEDULER_ENABLED": False})
+    with app.app_context():
+        differences = rebuild_positions(portfolio_id=args.portfolio, check=args.check)
+
+        for diff in differences:
+            print(
+                f"portfolio {diff['portfolio_id']} asset {diff['asset_id']} {diff['field']}: "
+                f"stored {diff['stored']:.6f}, expected {diff['expected']:.6f}"
+            )
+
+        if args.check:
+            print(f"{len(differences)} differences found")
+            return 1 if differences else 0
+
+        db.session.commit()
+        print(f"Rebuilt positions, fixed {len(differences)} values")
+        return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,7 +1,6 @@
 import sys
 import os
 import random
-import yfinance as yf
 from datetime import datetime, timezone, timedelta
 
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../')))
@@ -16,6 +15,9 @@ from app.models.portfolio_history import PortfolioHistory
 from app.models.asset_history import AssetHistory
 from app.models.watchlist import Watchlist
 from app.services.asset_service import fetch_latest_price
+from app.services.market_data import get_provider
+from app.services.position_service import rebuild_positions
+from app.services.price_store import price_store
 from app.utils.seeding_functions import create_random_sell_transaction, generate_portfolio_history, generate_asset_history, generate_asset_history_for_new_watchlist_item
 
 def generate_random_date_2024():
@@ -27,11 +29,12 @@ def generate_random_date_2024():
     return start_2024 + timedelta(seconds=random_seconds)
 
 def seed_database():
-    app = create_app()
+    app = create_app({"SCHEDULER_ENABLED": False})
 
     with app.app_context():
         db.drop_all()
         db.create_all()
+        price_store.clear()
 
         # Create portfolio first
         portfolio = Portfolio(name="Retirement Portfolio")
@@ -102,14 +105,13 @@ def seed_database():
         
         for sym, name, quantity in holdings_data:
             try:
-                ticker = yf.Ticker(sym)
-                data = ticker.history(period="1d")
+                closes = get_provider().get_history(sym, period="1d")
 
-                if data.empty:
+                if closes.empty:
                     print(f"❌ No data for {sym}")
                     continue
 
-                price = round(data["Close"].iloc[-1], 2)
+                price = round(closes.iloc[-1], 2)
 
                 # Fetch asset info using the proper function
                 custom_info = get_asset_info(sym)
@@ -245,6 +247,11 @@ def seed_database():
         else:
             print("❌ No existing holdings for hardcoded buy")
 
+        # Lots above were written directly, so derive the positions table from them
+        rebuild_positions()
+        db.session.commit()
+        print("✅ Rebuilt positions from holdings and transactions")
+
         # === ASSETS WITHOUT HOLDINGS (for market data, watchlist, etc.) ===
         assets_only = [
             ("META", "Meta Platforms Inc."),
@@ -267,10 +274,9 @@ def seed_database():
         
         for sym, name in assets_only:
             try:
-                ticker = yf.Ticker(sym)
-                data = ticker.history(period="1d")
+                closes = get_provider().get_history(sym, period="1d")
 
-                if data.empty:
+                if closes.empty:
                     print(f"❌ No data for asset {sym}")
                     continue
 
@@ -343,7 +349,7 @@ if __name__ == "__main__":
         seed_database()
         
         # Generate portfolio history for all portfolios
-        app = create_app()
+        app = create_app({"SCHEDULER_ENABLED": False})
         with app.app_context():
             portfolios = Portfolio.query.all()
             for portfolio in portfolios:
@@ -0,0 +1,32 @@
+"""
+Adds the missing daily portfolio_history rows since each portfolio's last snapshot,
+up to yesterday.
+Safe to run repeatedly, e.g. from cron:
+
+    python tools/snapshot_portfolios.py
+    python tools/snapshot_portfolios.py --portfolio 1 --portfolio 2
+"""
+
+import argparse
+import os
+import sys
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../')))
+
+from app import create_app
+from app.services.portfolio_service import snapshot_portfolio_history
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Write missing daily portfolio history snapshots.")
+    parser.add_argument("--portfolio", type=int, action="append", help="only this portfolio id (repeatable)")
+    args = parser.parse_args()
+
+    app = create_app({"SCHEDULER_ENABLED": False})
+    with app.app_context():
+        written = snapshot_portfolio_history(portfolio_ids=args.portfolio)
+    print(f"Wrote {written} portfolio history rows")
+
+
+if __name__ == "__main__":
+    main()